@@ -0,0 +1,61 @@
+"""Color palette extraction, gradients and visualization.
+
+Public names are resolved lazily, so ``import artutils`` is cheap and only the
+modules (and heavy dependencies) an attribute actually needs get imported.
+"""
+import importlib
+
+_EXPORTS = {
+    'color_utils': [
+        'hex_to_rgb_normalized', 'rgb_normalized_to_hex', 'hex_to_lab', 'hex_to_rgb_array',
+        'rgb_array_to_hex', 'palette_to_rgb', 'palette_to_lab', 'rgb_to_lab_array', 'rgb_to_lab_lut', 'lab_to_rgb_array', 'hex_to_lab_array',
+        'rgb_to_hls_array', 'hls_to_rgb_array', 'rgb_to_hsv_array', 'hsv_to_rgb_array',
+        'rgb_to_oklab_array', 'oklab_to_rgb_array', 'deduplicate_colors', 'deduplicate_lab',
+        'delta_e', 'interpolate_hsl_gradient', 'gradient_array', 'generate_full_hsl_gradient',
+        'generate_opposite_palette', 'get_hex_codes_from_centers', 'get_hex_codes_from_gmm_means',
+    ],
+    'metrics': [
+        'delta_e_cie76', 'delta_e_cie94', 'delta_e_ciede2000', 'register_metric', 'get_metric',
+        'delta_e_to_many', 'pairwise_delta_e', 'delta_e_radius',
+    ],
+    'palette_tools': [
+        'sort_palette_by_closeness', 'sort_lab_by_closeness', 'color_histogram',
+        'palette_from_histogram', 'extract_palette_by_frequency_and_lab', 'extract_palette_streaming',
+    ],
+    'clustering': [
+        'fit_kmeans', 'fit_kmeans_minibatch', 'kmeans_centers_to_hex', 'fit_gmm', 'fit_gmm_online',
+        'collapse_pixels', 'fit_weighted_gmm', 'color_features', 'features_to_rgb',
+        'gmm_means_to_hex', 'fit_gmm_to_colors', 'soft_blend_pixels', 'gmm_soft_gradient',
+    ],
+    'io_utils': [
+        'decode_image', 'load_and_resize_image', 'load_pixels', 'iter_image_strips',
+        'sample_image_pixels', 'sample_indices', 'sample_pixels', 'iter_pixel_chunks',
+        'plot_image', 'save_tile',
+    ],
+    'visualization': ['plot_swatch', 'plot_wheel', 'render_swatch', 'render_wheel'],
+    'palette': ['Palette'],
+    'video': ['VideoPaletteTracker', 'video_palettes', 'iter_video_frames'],
+    'palette_index': ['PaletteIndex', 'pack_palettes', 'lab_histogram_embedding', 'centroid_embedding'],
+    'cache': ['PaletteCache', 'cached', 'make_key'],
+    'batch': ['batch_extract', 'BatchResult'],
+    'aio': ['extract_palette_async', 'gmm_soft_gradient_async', 'kmeans_palette_async', 'gmm_palette_async', 'run_async', 'set_executor'],
+    'profiling': ['profile', 'add_listener', 'remove_listener', 'summarize', 'log_listener', 'to_otel_spans', 'otel_listener'],
+}
+
+_SUBMODULES = set(_EXPORTS)
+_ATTRS = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_ATTRS)
+
+def __getattr__(name):
+    if name in _ATTRS:
+        value = getattr(importlib.import_module(f'{__name__}.{_ATTRS[name]}'), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f'{__name__}.{name}')
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | _SUBMODULES | set(_ATTRS))
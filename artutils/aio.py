@@ -0,0 +1,107 @@
+import asyncio, contextvars, functools
+from concurrent.futures import ProcessPoolExecutor
+from artutils.batch import palette_task, gmm_gradient_task, kmeans_task, gmm_task
+from artutils.cache import make_key
+
+# asyncio front end: CPU work runs in an executor so the event loop stays free,
+# and identical requests in flight share one computation.
+
+_executor = None
+_inflight = {}
+
+def set_executor(executor):
+    """Executor for the async entry points (None: the loop's default thread pool). Returns the previous one.
+
+    A ``ProcessPoolExecutor`` sidesteps the GIL for the pure-Python parts;
+    image bytes and keyword arguments must then pickle.
+    """
+    global _executor
+    previous, _executor = _executor, executor
+    return previous
+
+class _Shared:
+    """One in-flight computation and the number of callers still waiting on it."""
+
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+def _forget(entry, shared):
+    if _inflight.get(entry) is shared:
+        del _inflight[entry]
+
+def _submit(loop, executor, func, image, kwargs):
+    call = functools.partial(func, image, **kwargs)
+    if not isinstance(executor, ProcessPoolExecutor):
+        # threads see the caller's context, so profile() and listeners still apply
+        call = functools.partial(contextvars.copy_context().run, call)
+    return loop.run_in_executor(executor, call)
+
+async def _compute(loop, executor, io_executor, func, image, kwargs, cache, key):
+    result = await _submit(loop, executor, func, image, kwargs)
+    if cache is not None:
+        # stored before the in-flight entry goes, so no caller slips between the two and recomputes
+        await loop.run_in_executor(io_executor, cache.set, key, result)
+    return result
+
+async def run_async(func, image, executor=None, timeout=None, coalesce=True, cache=None, **kwargs):
+    """Await ``func(image, **kwargs)`` computed in ``executor`` (default: ``set_executor``'s, else the loop's).
+
+    ``image`` is encoded image bytes (or a path or array). Concurrent calls with
+    the same function, image contents and arguments share one computation when
+    ``coalesce`` is set. A caller that times out (``asyncio.TimeoutError`` after
+    ``timeout`` seconds) or is cancelled stops waiting without disturbing the
+    others; once no caller is left the work is cancelled if it has not started
+    (work already running in a worker finishes in the background).
+    ``cache`` (a ``PaletteCache``) keeps finished results across calls.
+    """
+    loop = asyncio.get_running_loop()
+    executor = executor if executor is not None else _executor
+    if isinstance(image, (bytearray, memoryview)):
+        image = bytes(image)
+    # hashing the image and the cache's disk I/O block, so they run off the loop too
+    # (in the loop's thread pool when the work itself goes to processes)
+    io_executor = None if isinstance(executor, ProcessPoolExecutor) else executor
+    key = None
+    if coalesce or cache is not None:
+        key = await loop.run_in_executor(io_executor, functools.partial(
+            make_key, f"{func.__module__}.{func.__qualname__}", image, **kwargs))
+    if cache is not None:
+        missing = object()
+        value = await loop.run_in_executor(io_executor, cache.get, key, missing)
+        if value is not missing:
+            return value
+
+    # no await between the lookup and the insert, so equal calls cannot both start the work
+    shared = _inflight.get((loop, key)) if coalesce else None
+    if shared is None:
+        shared = _Shared(asyncio.ensure_future(_compute(loop, executor, io_executor, func, image, kwargs, cache, key)))
+        if coalesce:
+            _inflight[(loop, key)] = shared
+            shared.task.add_done_callback(lambda _, shared=shared: _forget((loop, key), shared))
+    shared.waiters += 1
+    try:
+        return await asyncio.wait_for(asyncio.shield(shared.task), timeout)
+    finally:
+        shared.waiters -= 1
+        if not shared.waiters and not shared.task.done():
+            _forget((loop, key), shared)
+            shared.task.cancel()
+
+async def extract_palette_async(image, executor=None, timeout=None, coalesce=True, cache=None, **kwargs):
+    """Async ``extract_palette_by_frequency_and_lab``; see ``run_async`` for the options."""
+    return await run_async(palette_task, image, executor, timeout, coalesce, cache, **kwargs)
+
+async def gmm_soft_gradient_async(image, executor=None, timeout=None, coalesce=True, cache=None, **kwargs):
+    """Async ``gmm_soft_gradient``; keep ``rng`` a seed (the default) so coalescing and caching see equal calls."""
+    return await run_async(gmm_gradient_task, image, executor, timeout, coalesce, cache, **kwargs)
+
+async def kmeans_palette_async(image, executor=None, timeout=None, coalesce=True, cache=None, **kwargs):
+    """Async ``fit_kmeans`` on the decoded image, returning the centers as hex (as the 'kmeans' batch task)."""
+    return await run_async(kmeans_task, image, executor, timeout, coalesce, cache, **kwargs)
+
+async def gmm_palette_async(image, executor=None, timeout=None, coalesce=True, cache=None, **kwargs):
+    """Async ``fit_gmm`` on the decoded image, returning the means as hex (as the 'gmm' batch task)."""
+    return await run_async(gmm_task, image, executor, timeout, coalesce, cache, **kwargs)
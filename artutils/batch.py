@@ -0,0 +1,154 @@
+import json, os
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import numpy as np
+from artutils.io_utils import load_pixels
+from artutils.palette import Palette
+from artutils.palette_tools import extract_palette_by_frequency_and_lab
+from artutils.clustering import fit_kmeans, fit_gmm, kmeans_centers_to_hex, gmm_means_to_hex, gmm_soft_gradient
+
+BatchResult = namedtuple('BatchResult', ['index', 'source', 'result', 'error'])
+
+# worker tasks: top-level so they pickle into a process pool
+
+def palette_task(source, **kwargs):
+    return extract_palette_by_frequency_and_lab(source, **kwargs)
+
+def gmm_gradient_task(source, **kwargs):
+    return gmm_soft_gradient(source, **kwargs)
+
+def kmeans_task(source, size=(100, 100), **kwargs):
+    pixels = load_pixels(source, size=size)
+    model = fit_kmeans(pixels, **kwargs)
+    return kmeans_centers_to_hex(model.cluster_centers_, model.color_space_)
+
+def gmm_task(source, size=(100, 100), **kwargs):
+    pixels = load_pixels(source, size=size)
+    model = fit_gmm(pixels, **kwargs)
+    return gmm_means_to_hex(model.means_, model.color_space_)
+
+BATCH_TASKS = {
+    'palette': palette_task,
+    'gmm_gradient': gmm_gradient_task,
+    'kmeans': kmeans_task,
+    'gmm': gmm_task,
+}
+
+def _run_task(task, source, kwargs):
+    """Run one item in the worker, turning failures into an error string so the batch keeps going."""
+    try:
+        return task(source, **kwargs), None
+    except Exception as exc:
+        return None, f"{type(exc).__name__}: {exc}"
+
+def _source_label(source):
+    if isinstance(source, np.ndarray):
+        return f"<array {source.shape} {source.dtype}>"
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return f"<{len(source)} bytes>"
+    return os.fspath(source)
+
+def _jsonable(value):
+    if isinstance(value, Palette):
+        return value.hex
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return repr(value)
+
+def _record(item):
+    return {'index': item.index, 'source': _source_label(item.source), 'result': item.result, 'error': item.error}
+
+class _Writer:
+    """Stream records to JSONL as they arrive, or collect them for a Parquet file at the end."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = str(path).endswith('.parquet')
+        self.rows = []
+        self.file = None
+        if self.parquet:
+            try:
+                import pyarrow, pyarrow.parquet
+            except ImportError:
+                raise ImportError("Writing Parquet output requires pyarrow (pip install pyarrow).") from None
+        else:
+            self.file = open(path, 'w')
+
+    def write(self, item):
+        record = _record(item)
+        if self.parquet:
+            record['result'] = json.dumps(record['result'], default=_jsonable)
+            self.rows.append(record)
+        else:
+            self.file.write(json.dumps(record, default=_jsonable) + '\n')
+            self.file.flush()
+
+    def close(self):
+        if not self.parquet:
+            self.file.close()
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.Table.from_pylist(self.rows), self.path)
+
+def batch_extract(sources, task='palette', workers=None, ordered=True, max_pending=None, output=None, executor=None, **task_kwargs):
+    """Run a palette task over many images on a process pool, yielding ``BatchResult`` tuples.
+
+    ``sources`` is any iterable of paths, bytes or RGB arrays and is consumed lazily:
+    at most ``max_pending`` items (default twice the worker count) are in flight or
+    held back for ordering, so decode and extraction of different images overlap
+    without queueing the whole library. ``task`` is a ``BATCH_TASKS`` name or a picklable ``f(source, **kwargs)``.
+    Results come back in submission order, or as they finish with ``ordered=False``.
+    A failing item yields a result with ``error`` set instead of stopping the batch.
+    ``output`` also writes every result to a ``.jsonl`` (streamed) or ``.parquet`` file.
+    """
+    task = BATCH_TASKS[task] if isinstance(task, str) else task
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    writer = _Writer(output) if output else None
+    own_executor = executor is None
+    executor = ProcessPoolExecutor(max_workers=workers) if own_executor else executor
+    items = enumerate(sources)
+    pending = {}
+    finished = {}
+    next_index = 0
+
+    def submit_more():
+        # finished results still waiting for an earlier index count too, so ordered mode stays bounded
+        while len(pending) + len(finished) < max_pending:
+            entry = next(items, None)
+            if entry is None:
+                return
+            index, source = entry
+            pending[executor.submit(_run_task, task, source, task_kwargs)] = (index, source)
+
+    try:
+        submit_more()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, source = pending.pop(future)
+                try:
+                    result, error = future.result()
+                except Exception as exc:  # e.g. a worker process died
+                    result, error = None, f"{type(exc).__name__}: {exc}"
+                item = BatchResult(index, source, result, error)
+                if writer:
+                    writer.write(item)
+                if ordered:
+                    finished[index] = item
+                else:
+                    yield item
+            while ordered and next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
+            submit_more()
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if writer:
+            writer.close()
@@ -0,0 +1,182 @@
+import functools, hashlib, inspect, json, os, pickle, sqlite3, threading
+from collections import OrderedDict
+import numpy as np
+
+# content-addressed result cache
+
+def _hash_stream(h, f):
+    for block in iter(lambda: f.read(1 << 20), b''):
+        h.update(block)
+
+def image_digest(image):
+    """Hash an image source: file contents for paths and file objects, raw bytes, or array data plus shape and dtype.
+
+    File objects are read from their current position and rewound afterwards.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    if isinstance(image, np.ndarray):
+        h.update(repr((image.shape, image.dtype.str)).encode())
+        h.update(np.ascontiguousarray(image).tobytes())
+    elif isinstance(image, (bytes, bytearray, memoryview)):
+        h.update(image)
+    elif hasattr(image, 'read'):
+        if not (hasattr(image, 'seekable') and image.seekable()):
+            raise ValueError("Cannot hash a non-seekable file object without consuming it; pass its bytes instead.")
+        start = image.tell()
+        _hash_stream(h, image)
+        image.seek(start)
+    else:
+        with open(image, 'rb') as f:
+            _hash_stream(h, f)
+    return h.hexdigest()
+
+def _param_json(value):
+    """JSON stand-in for parameters json cannot encode: arrays and palettes by content, anything else by repr."""
+    from artutils.palette import Palette
+    if isinstance(value, Palette):
+        weights = None if value.weights is None else image_digest(np.asarray(value.weights))
+        return {'palette': image_digest(np.asarray(value.rgb)), 'weights': weights}
+    if isinstance(value, np.ndarray):
+        return {'array': image_digest(value)}
+    if isinstance(value, np.generic):
+        return value.item()
+    return repr(value)
+
+def make_key(name, image, **params):
+    """Cache key for ``name`` applied to ``image`` with ``params`` (order-insensitive).
+
+    Array and ``Palette`` parameters are keyed by their full contents.
+    """
+    payload = json.dumps(params, sort_keys=True, default=_param_json)
+    return hashlib.blake2b(f"{name}\0{image_digest(image)}\0{payload}".encode(), digest_size=20).hexdigest()
+
+class PaletteCache:
+    """Thread-safe LRU of computed results with an optional sqlite tier shared across processes.
+
+    ``maxsize`` bounds the in-memory entries; with ``directory`` set, every result is
+    also written to ``directory/artutils-cache.sqlite3`` and memory misses fall back
+    to it. Cached values are shared, so treat them as read-only.
+    """
+
+    def __init__(self, maxsize=256, directory=None):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.hits = self.disk_hits = self.misses = self.evictions = 0
+        self.db_path = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.db_path = os.path.join(directory, 'artutils-cache.sqlite3')
+            with self._connect() as db:
+                db.execute('PRAGMA journal_mode=WAL')
+                db.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL)')
+
+    def _connect(self):
+        # one short-lived connection per operation keeps the store safe across threads and forked workers
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        if self.db_path:
+            with self._connect() as db:
+                row = db.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                value = pickle.loads(row[0])
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, value)
+                return value
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def set(self, key, value):
+        self._remember(key, value)
+        if self.db_path:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            with self._connect() as db:
+                db.execute('INSERT OR REPLACE INTO entries (key, value) VALUES (?, ?)', (key, blob))
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for ``key``, computing it once even if several threads ask at once."""
+        missing = object()
+        while True:
+            value = self.get(key, missing)
+            if value is not missing:
+                return value
+            with self._lock:
+                event = self._pending.get(key)
+                owner = event is None
+                if owner:
+                    event = self._pending[key] = threading.Event()
+            if not owner:
+                event.wait()
+                continue
+            try:
+                value = compute()
+                self.set(key, value)
+                return value
+            finally:
+                with self._lock:
+                    del self._pending[key]
+                event.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            with self._connect() as db:
+                db.execute('DELETE FROM entries')
+
+    def stats(self):
+        """Hit/miss counters for sizing the cache."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+default_cache = PaletteCache()
+
+def cached(func, cache=None):
+    """Wrap an entry point whose first argument is the image (path, bytes or array) with a cache.
+
+    The key covers the image contents and every bound argument, defaults included,
+    e.g. ``cached(extract_palette_by_frequency_and_lab)`` or ``cached(fit_kmeans)``.
+    Pass seeds rather than ``np.random.Generator`` objects, which never hash equal.
+    """
+    cache = default_cache if cache is None else cache
+    signature = inspect.signature(func)
+    first = next(iter(signature.parameters))
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        params = dict(bound.arguments)
+        image = params.pop(first)
+        key = make_key(name, image, **params)
+        return cache.get_or_compute(key, lambda: func(*args, **kwargs))
+
+    wrapper.cache = cache
+    return wrapper
@@ -1,75 +1,424 @@
+import os, threading
+from collections import OrderedDict
 import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.mixture import GaussianMixture
-from kneed import KneeLocator
-from artutils.io_utils import load_and_resize_image
-from artutils.palette_tools import deduplicate_colors, sort_palette_by_closeness
-from artutils.color_utils import interpolate_hsl_gradient, rgb_normalized_to_hex, generate_full_hsl_gradient
+from concurrent.futures import ThreadPoolExecutor
+from artutils.cache import image_digest
+from artutils.io_utils import load_pixels, sample_image_pixels, sample_pixels
+from artutils.palette_tools import sort_lab_by_closeness, color_histogram
+from artutils.color_utils import (rgb_array_to_hex, rgb_to_lab_array, lab_to_rgb_array, rgb_to_oklab_array,
+                                  oklab_to_rgb_array, deduplicate_lab, generate_full_hsl_gradient)
+from artutils.profiling import stage, staged
+
+# scikit-learn, kneed and scipy.linalg are imported where used: they dominate
+# import time and many callers only need the color helpers.
+
+# model selection sweeps
+
+def _k_rng(random_state, k):
+    """Generator for the extra centers of candidate ``k``, independent of the thread that fits it."""
+    return np.random.default_rng(None if random_state is None else [random_state, k])
+
+def _seed_extra_centers(centers, pixels, k, rng, weight=None):
+    """Grow ``centers`` to ``k`` rows by k-means++ style D² sampling over (a sample of) the pixels."""
+    X, w = pixels, weight
+    if len(pixels) > 10000:
+        idx = rng.choice(len(pixels), 10000, replace=False)
+        X, w = pixels[idx], None if weight is None else weight[idx]
+    centers = list(centers)
+    d2 = ((X[:, None, :] - np.asarray(centers)[None, :, :]) ** 2).sum(-1).min(axis=1)
+    while len(centers) < k:
+        score = d2 if w is None else d2 * w
+        total = score.sum()
+        new = X[rng.choice(len(X), p=score / total)] if total > 0 else X[rng.integers(len(X))]
+        centers.append(new)
+        d2 = np.minimum(d2, ((X - new) ** 2).sum(-1))
+    return np.asarray(centers, dtype=float)
+
+# clustering feature spaces: features come from 0-255 RGB, centers go back to 0-255 RGB
+
+FEATURE_SPACES = {
+    'rgb': (None, None),
+    'lab': (rgb_to_lab_array, lab_to_rgb_array),
+    'oklab': (rgb_to_oklab_array, oklab_to_rgb_array),
+}
+_FEATURE_CACHE_SIZE = 4
+_feature_cache = OrderedDict()
+_feature_lock = threading.Lock()
+
+def _space(color_space):
+    try:
+        return FEATURE_SPACES[color_space]
+    except KeyError:
+        raise ValueError(f"Unknown color space {color_space!r}; expected one of {sorted(FEATURE_SPACES)}.") from None
+
+def _to_features(rgb, color_space):
+    rgb = np.asarray(rgb, dtype=float).reshape(-1, 3)
+    to_space, _ = _space(color_space)
+    return rgb if to_space is None else to_space(rgb / 255.0)
+
+def color_features(pixels, color_space='rgb'):
+    """(N, 3) float clustering features of 0-255 RGB pixels in ``color_space``.
+
+    Conversions of the last few pixel arrays are cached by content, so fitting
+    several models on one image converts it once, and an array changed in place
+    is converted again. Cached arrays are read-only.
+    """
+    if color_space == 'rgb' or not isinstance(pixels, np.ndarray):
+        return _to_features(pixels, color_space)
+    key = (image_digest(pixels), color_space)
+    with _feature_lock:
+        features = _feature_cache.get(key)
+        if features is not None:
+            _feature_cache.move_to_end(key)
+            return features
+    features = _to_features(pixels, color_space)
+    features.flags.writeable = False
+    with _feature_lock:
+        _feature_cache[key] = features
+        while len(_feature_cache) > _FEATURE_CACHE_SIZE:
+            _feature_cache.popitem(last=False)
+    return features
+
+def features_to_rgb(features, color_space='rgb'):
+    """Map centers from ``color_space`` features back to 0-255 RGB floats."""
+    _, from_space = _space(color_space)
+    features = np.asarray(features, dtype=float).reshape(-1, 3)
+    return features if from_space is None else from_space(features) * 255.0
+
+def collapse_pixels(pixels, quantize_bits=8):
+    """Collapse (N, 3) uint8 pixels to their unique colors (or ``quantize_bits`` bins) with pixel counts.
+
+    Returns float features and weights for the weighted fits; with 8 bits the
+    weighted problem is exactly the per-pixel one.
+    """
+    colors, counts = color_histogram(pixels, bits=quantize_bits)
+    return colors.astype(float), counts.astype(float)
+
+def _features(pixels, sample_weight=None, quantize_bits=None, color_space='rgb'):
+    """(X, weight) for a fit: pixel features, or collapsed-color features when ``quantize_bits`` is set."""
+    if quantize_bits:
+        if sample_weight is not None:
+            raise ValueError("Pass either sample_weight or quantize_bits, not both.")
+        colors, counts = collapse_pixels(pixels, quantize_bits)
+        return _to_features(colors, color_space), counts
+    X = color_features(pixels, color_space)
+    if sample_weight is None:
+        return X, None
+    return X, np.asarray(sample_weight, dtype=float).reshape(-1)
+
+SWEEP_BATCH = 4
+
+def _sweep(k_values, fit_one, done, n_jobs=None):
+    """Fit candidate k in batches of ``SWEEP_BATCH`` on ``n_jobs`` threads; returns {k: model}.
+
+    ``fit_one(k, prev)`` gets the previous batch's largest model as an extra
+    starting point. Batches do not depend on ``n_jobs``, so neither do the
+    models. Stops as soon as ``done(models)`` says the choice is settled.
+    """
+    n_jobs = n_jobs or min(4, os.cpu_count() or 1)
+    k_values = list(k_values)
+    models = {}
+    prev = None
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        for start in range(0, len(k_values), SWEEP_BATCH):
+            batch = k_values[start:start + SWEEP_BATCH]
+            fitted = list(pool.map(lambda k: fit_one(k, prev), batch))
+            models.update(zip(batch, fitted))
+            prev = fitted[-1]
+            if done(models):
+                break
+    return models
 
 # k‑means helpers
 
-def fit_kmeans(pixels, max_k=11, use_elbow=False):
-
-    if use_elbow:
-        inertias = []
-        k_values = range(1, max_k + 1)
-        
-        for k in k_values:
-            kmeans = KMeans(n_clusters=k, random_state=42, n_init='auto')
-            kmeans.fit(pixels)
-            inertias.append(kmeans.inertia_)
-        
-        knee = KneeLocator(k_values, inertias, curve='convex', direction='decreasing').knee
-        k = knee
+def _fit_kmeans_k(pixels, k, prev=None, weight=None, random_state=42):
+    """k-means with the usual cold init; a smaller ``prev`` also seeds a warm fit, and the lower inertia wins."""
+    from sklearn.cluster import KMeans
+    model = KMeans(n_clusters=k, random_state=random_state, n_init='auto').fit(pixels, sample_weight=weight)
+    if prev is None or k <= prev.n_clusters:
+        return model
+    init = _seed_extra_centers(prev.cluster_centers_, pixels, k, _k_rng(random_state, k), weight)
+    warm = KMeans(n_clusters=k, init=init, n_init=1, random_state=random_state).fit(pixels, sample_weight=weight)
+    return warm if warm.inertia_ < model.inertia_ else model
+
+def _elbow(models):
+    ks = sorted(models)
+    if len(ks) < 3:
+        return None
+    from kneed import KneeLocator
+    return KneeLocator(ks, [models[k].inertia_ for k in ks], curve='convex', direction='decreasing').knee
+
+@staged()
+def fit_kmeans(pixels, max_k=11, use_elbow=False, n_jobs=None, patience=None, sample_weight=None, quantize_bits=None, color_space='rgb', random_state=42):
+    """Fit k-means with ``max_k`` clusters, or pick k at the inertia elbow.
+
+    The elbow sweep fits candidates on ``n_jobs`` threads. Each k keeps its usual
+    cold fit unless a fit warm-started from the previous batch's largest model
+    has lower inertia, so the result does not depend on ``n_jobs``. The knee
+    depends on the whole inertia curve, so stopping early is opt-in: with
+    ``patience`` set, the sweep ends once the knee of the curve so far has held
+    for ``patience`` more k.
+
+    ``quantize_bits`` (8 for exact unique colors, fewer to bin) fits on the
+    collapsed colors weighted by pixel count instead of every pixel; k is capped
+    at the number of distinct colors. ``sample_weight`` weights the given rows directly.
+
+    ``color_space`` ('rgb', 'lab' or 'oklab') clusters in that space; centers stay
+    in it (recorded as ``color_space_``), so convert with
+    ``kmeans_centers_to_hex(model.cluster_centers_, model.color_space_)``.
+
+    ``random_state`` (an int, or None for a fresh seed) seeds every fit and the
+    warm-start centers, so repeated calls give the same model.
+    """
+    pixels, weight = _features(pixels, sample_weight, quantize_bits, color_space)
+    if weight is not None:
+        max_k = min(max_k, len(pixels))
+    if not use_elbow:
+        model = _fit_kmeans_k(pixels, max_k, weight=weight, random_state=random_state)
+        model.color_space_ = color_space
+        return model
+
+    knees = []
+    def done(models):
+        knees.append(_elbow(models))
+        return (patience is not None and len(knees) > 1 and knees[-1] is not None
+                and knees[-1] == knees[-2] and max(models) >= knees[-1] + patience)
+
+    models = _sweep(range(1, max_k + 1), lambda k, prev: _fit_kmeans_k(pixels, k, prev, weight, random_state), done, n_jobs)
+    knee = _elbow(models)
+    model = models[knee if knee is not None else max(models)]
+    model.color_space_ = color_space
+    return model
+
+def kmeans_centers_to_hex(centers, color_space='rgb'):
+    return rgb_array_to_hex(np.round(features_to_rgb(centers, color_space)).astype(int))
+
+def fit_kmeans_minibatch(chunks, n_clusters=8, batch_size=1024, init_model=None, random_state=42):
+    """Learn k-means centers incrementally from an iterable of pixel chunks.
+
+    ``init_model`` warm-starts from a previous result: a ``MiniBatchKMeans`` keeps
+    training in place, any other fitted k-means seeds the centers.
+    """
+    from sklearn.cluster import MiniBatchKMeans
+    if isinstance(init_model, MiniBatchKMeans):
+        model = init_model
+    elif init_model is not None:
+        centers = np.asarray(init_model.cluster_centers_, dtype=float)
+        model = MiniBatchKMeans(n_clusters=len(centers), init=centers, n_init=1, batch_size=batch_size, random_state=random_state)
     else:
-        k = max_k
-    
-    kmeans = KMeans(n_clusters=k, random_state=42, n_init='auto')
-    kmeans.fit(pixels)
-    return kmeans
+        model = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size, random_state=random_state, n_init='auto')
 
-def kmeans_centers_to_hex(centers):
-    hex_codes = []
-    for rgb in np.round(centers).astype(int):
-        hex_code = '#{:02x}{:02x}{:02x}'.format(*rgb)
-        hex_codes.append(hex_code)
-    return hex_codes
+    for chunk in chunks:
+        model.partial_fit(np.asarray(chunk, dtype=float).reshape(-1, 3))
+    return model
 
 # GMM helpers + soft gradient
 
-def fit_gmm(pixels,max_k=20,use_bic=False):
-    if use_bic:
-        bics = []
-        k_range = range(1, max_k + 1)
-        
-        for k in k_range:
-            gmm = GaussianMixture(n_components=k, random_state=42)
-            gmm.fit(pixels)
-            bics.append(gmm.bic(pixels))
-        
-        best_k = k_range[bics.index(min(bics))]
+def _gmm_log_likelihood(gmm, pixels, weight=None):
+    scores = gmm.score_samples(pixels)
+    return scores.sum() if weight is None else weight @ scores
+
+def _fit_gmm_k(pixels, k, prev=None, weight=None, random_state=42):
+    """GMM with the usual cold init; a smaller ``prev`` also seeds a warm fit, and the higher likelihood wins."""
+    from sklearn.mixture import GaussianMixture
+    if weight is not None:
+        gmm = fit_weighted_gmm(pixels, weight, k, random_state=random_state)
     else:
-        best_k = max_k
-    
-    gmm = GaussianMixture(n_components=best_k, random_state=42)
-    gmm.fit(pixels)
+        gmm = GaussianMixture(n_components=k, random_state=random_state).fit(pixels)
+    if prev is None or k <= prev.n_components:
+        return gmm
+    means = _seed_extra_centers(prev.means_, pixels, k, _k_rng(random_state, k), weight)
+    extra = k - prev.n_components
+    weights = np.concatenate([prev.weights_, np.full(extra, 1.0 / k)])
+    spread = np.cov(pixels, rowvar=False, aweights=weight) / k + prev.reg_covar * np.eye(pixels.shape[1])
+    if weight is not None:
+        covariances = np.concatenate([prev.covariances_, np.repeat(spread[None], extra, axis=0)])
+        warm = fit_weighted_gmm(pixels, weight, k, init=(weights / weights.sum(), means, covariances), random_state=random_state)
+    else:
+        precisions = np.concatenate([prev.precisions_, np.repeat(np.linalg.inv(spread)[None], extra, axis=0)])
+        warm = GaussianMixture(n_components=k, weights_init=weights / weights.sum(), means_init=means,
+                               precisions_init=precisions, random_state=random_state).fit(pixels)
+    better = _gmm_log_likelihood(warm, pixels, weight) > _gmm_log_likelihood(gmm, pixels, weight)
+    return warm if better else gmm
+
+@staged()
+def fit_gmm(pixels,max_k=20,use_bic=False, n_jobs=None, patience=None, sample_weight=None, quantize_bits=None, color_space='rgb', random_state=42):
+    """Fit a GMM with ``max_k`` components, or pick the count minimizing BIC.
+
+    The BIC sweep fits candidates on ``n_jobs`` threads, keeping for each k the
+    better of its cold fit and one warm-started from the previous batch (as in
+    ``fit_kmeans``). BIC can dip locally, so stopping early is opt-in: with
+    ``patience`` set, the sweep ends once the minimum is ``patience`` k behind.
+    ``quantize_bits`` / ``sample_weight`` fit on weighted colors with
+    ``fit_weighted_gmm`` (as in ``fit_kmeans``); BIC then counts every pixel.
+    ``color_space`` and ``random_state`` work as in ``fit_kmeans``; means stay in that space.
+    """
+    pixels, weight = _features(pixels, sample_weight, quantize_bits, color_space)
+    if weight is not None:
+        max_k = min(max_k, len(pixels))
+    if not use_bic:
+        gmm = _fit_gmm_k(pixels, max_k, weight=weight, random_state=random_state)
+        gmm.color_space_ = color_space
+        return gmm
+
+    def fit_one(k, prev):
+        gmm = _fit_gmm_k(pixels, k, prev, weight, random_state)
+        gmm.bic_ = gmm.bic(pixels) if weight is None else _weighted_bic(gmm, pixels, weight)
+        return gmm
+
+    def best(models):
+        return min(models, key=lambda k: models[k].bic_)
+
+    def done(models):
+        return patience is not None and max(models) >= best(models) + patience
+
+    models = _sweep(range(1, max_k + 1), fit_one, done, n_jobs)
+    gmm = models[best(models)]
+    gmm.color_space_ = color_space
+    return gmm
+
+
+def gmm_means_to_hex(means, color_space='rgb'):
+    return rgb_array_to_hex(np.round(features_to_rgb(means, color_space)).astype(int))
+
+def _precisions_cholesky(covariances):
+    from scipy.linalg import solve_triangular
+    prec_chol = np.empty_like(covariances)
+    eye = np.eye(covariances.shape[1])
+    for k, cov in enumerate(covariances):
+        prec_chol[k] = solve_triangular(np.linalg.cholesky(cov), eye, lower=True).T
+    return prec_chol
+
+def _set_gmm_params(gmm, weights, means, covariances):
+    """Install full-covariance parameters on a GaussianMixture so predict/score work on them."""
+    prec_chol = _precisions_cholesky(covariances)
+    gmm.weights_ = weights
+    gmm.means_ = means
+    gmm.covariances_ = covariances
+    gmm.precisions_cholesky_ = prec_chol
+    gmm.precisions_ = prec_chol @ prec_chol.transpose(0, 2, 1)
+    gmm.n_features_in_ = means.shape[1]
+    gmm.converged_ = True
+    return gmm
+
+def _log_gaussian(X, means, prec_chol):
+    """(N, K) log densities of full-covariance Gaussians from the Cholesky factors of their precisions."""
+    y = np.matmul(X, prec_chol) - np.einsum('kd,kde->ke', means, prec_chol)[:, None, :]
+    log_det = np.log(np.diagonal(prec_chol, axis1=1, axis2=2)).sum(axis=1)
+    return (log_det - 0.5 * X.shape[1] * np.log(2 * np.pi)) - 0.5 * np.square(y).sum(axis=2).T
+
+def _weighted_m_step(X, weight, resp, reg_covar):
+    rw = resp * weight[:, None]
+    nk = rw.sum(axis=0) + 10 * np.finfo(float).eps
+    means = (rw.T @ X) / nk[:, None]
+    covariances = np.empty((len(nk), X.shape[1], X.shape[1]))
+    for k in range(len(nk)):
+        diff = X - means[k]
+        covariances[k] = (rw[:, k, None] * diff).T @ diff / nk[k]
+    covariances += reg_covar * np.eye(X.shape[1])
+    return nk / nk.sum(), means, covariances
+
+def fit_weighted_gmm(X, sample_weight, n_components=5, init=None, max_iter=100, tol=1e-3, reg_covar=1e-6, random_state=42):
+    """Full-covariance EM on weighted samples, e.g. unique colors weighted by pixel count.
+
+    Every EM statistic is a weighted sum, so this fits the same model as
+    ``GaussianMixture`` on the expanded pixels at the cost of the unique colors.
+    Starts, like sklearn, from a (weighted) k-means labelling unless ``init`` gives
+    ``(weights, means, covariances)``. Returns a fitted ``GaussianMixture``.
+    """
+    from sklearn.cluster import KMeans
+    from sklearn.mixture import GaussianMixture
+    X = np.asarray(X, dtype=float).reshape(-1, 3)
+    weight = np.asarray(sample_weight, dtype=float).reshape(-1)
+    if init is None:
+        labels = KMeans(n_clusters=n_components, n_init=1, random_state=random_state).fit(X, sample_weight=weight).labels_
+        resp = np.zeros((len(X), n_components))
+        resp[np.arange(len(X)), labels] = 1
+        weights, means, covariances = _weighted_m_step(X, weight, resp, reg_covar)
+    else:
+        weights, means, covariances = (np.asarray(a, dtype=float) for a in init)
+
+    total = weight.sum()
+    lower_bound = -np.inf
+    converged = False
+    for n_iter in range(1, max_iter + 1):
+        log_prob = _log_gaussian(X, means, _precisions_cholesky(covariances)) + np.log(weights)
+        top = log_prob.max(axis=1, keepdims=True)
+        resp = np.exp(log_prob - top)
+        norm = resp.sum(axis=1, keepdims=True)
+        resp /= norm
+        log_norm = (top + np.log(norm))[:, 0]
+        weights, means, covariances = _weighted_m_step(X, weight, resp, reg_covar)
+        previous, lower_bound = lower_bound, (weight @ log_norm) / total
+        if abs(lower_bound - previous) < tol:
+            converged = True
+            break
+
+    gmm = GaussianMixture(n_components=n_components, covariance_type='full', reg_covar=reg_covar,
+                          tol=tol, max_iter=max_iter, random_state=random_state)
+    _set_gmm_params(gmm, weights, means, covariances)
+    gmm.converged_ = converged
+    gmm.n_iter_ = n_iter
+    gmm.lower_bound_ = lower_bound
     return gmm
 
+def _weighted_bic(gmm, X, weight):
+    k, d = gmm.means_.shape
+    n_parameters = k * d * (d + 1) / 2 + k * d + k - 1
+    return -2 * (weight @ gmm.score_samples(X)) + n_parameters * np.log(weight.sum())
+
+def fit_gmm_online(chunks, n_components=5, init_model=None, decay=0.6, offset=2, random_state=42):
+    """Stepwise (online) EM for a full-covariance GMM over an iterable of pixel chunks.
 
-def gmm_means_to_hex(means):
-    hex_codes = []
-    for rgb in np.round(gmm_means).astype(int):
-        hex_code = '#{:02x}{:02x}{:02x}'.format(*rgb)
-        hex_codes.append(hex_code)
-    return hex_codes
+    The first chunk is fit with batch EM unless ``init_model`` (a fitted full-covariance
+    ``GaussianMixture``, updated in place) is given. Each later chunk blends its
+    sufficient statistics in with step size ``(t + offset) ** -decay``.
+    """
+    from sklearn.mixture import GaussianMixture
+    gmm = init_model
+    if gmm is not None and gmm.covariance_type != 'full':
+        raise ValueError("Online EM needs a GaussianMixture with covariance_type='full'.")
 
-def fit_gmm_to_colors(rgb_pixels, n_components=5):
+    for chunk in chunks:
+        X = np.asarray(chunk, dtype=float).reshape(-1, 3)
+        if gmm is None:
+            gmm = GaussianMixture(n_components=n_components, covariance_type='full', random_state=random_state).fit(X)
+            gmm.online_steps_ = 0
+            continue
+
+        w, mu, cov = gmm.weights_, gmm.means_, gmm.covariances_
+        s0 = w
+        s1 = w[:, None] * mu
+        s2 = w[:, None, None] * (cov + mu[:, :, None] * mu[:, None, :])
+
+        resp = gmm.predict_proba(X)
+        step = getattr(gmm, 'online_steps_', 0) + 1
+        rho = (step + offset) ** -decay
+        s0 = (1 - rho) * s0 + rho * resp.mean(axis=0)
+        s1 = (1 - rho) * s1 + rho * (resp.T @ X) / len(X)
+        s2 = (1 - rho) * s2 + rho * np.einsum('nk,ni,nj->kij', resp, X, X) / len(X)
+
+        means = s1 / s0[:, None]
+        covariances = s2 / s0[:, None, None] - means[:, :, None] * means[:, None, :]
+        covariances += gmm.reg_covar * np.eye(X.shape[1])
+        _set_gmm_params(gmm, s0 / s0.sum(), means, covariances)
+        gmm.online_steps_ = step
+    return gmm
 
-    gmm = GaussianMixture(n_components=n_components, covariance_type='full', random_state=42)
-    gmm.fit(rgb_pixels)
+def fit_gmm_to_colors(rgb_pixels, n_components=5, sample_weight=None, quantize_bits=None, color_space='rgb', random_state=42):
+    """GMM centroids and per-pixel soft probabilities; centroids are in ``color_space`` units."""
+    from sklearn.mixture import GaussianMixture
+    X, weight = _features(rgb_pixels, sample_weight, quantize_bits, color_space)
+    # quantized fits run on the collapsed colors, but probabilities are still returned for every input pixel
+    features = color_features(rgb_pixels, color_space) if quantize_bits else X
+    if weight is None:
+        gmm = GaussianMixture(n_components=n_components, covariance_type='full', random_state=random_state)
+        gmm.fit(features)
+    else:
+        gmm = fit_weighted_gmm(X, weight, min(n_components, len(X)), random_state=random_state)
     
     centroids = gmm.means_  # shape (n_components, 3)
-    soft_probs = gmm.predict_proba(rgb_pixels)  # shape (num_pixels, n_components)
+    soft_probs = gmm.predict_proba(features)  # shape (num_pixels, n_components)
     
     return centroids, soft_probs
 
@@ -77,32 +426,51 @@ def soft_blend_pixel(centroids, soft_probs):
     """Blend RGB centroids according to soft probabilities for a single pixel."""
     blended_rgb = np.average(centroids, axis=0, weights=soft_probs)
     return blended_rgb
-    
-def gmm_soft_gradient(image_path,n_components=5, sample_size=5000, steps_per_transition=30, deduplication_threshold=5):
-
-
-    image_rgb = load_and_resize_image(image_path, size=(100, 100))
-    pixels = image_rgb.reshape(-1, 3)
 
-    if len(pixels) > sample_size:
-        idx = np.random.choice(len(pixels), size=sample_size, replace=False)
-        pixels = pixels[idx]
+def soft_blend_pixels(centroids, soft_probs):
+    """Blend RGB centroids for every row of soft probabilities at once."""
+    soft_probs = np.asarray(soft_probs, dtype=float)
+    return (soft_probs @ centroids) / soft_probs.sum(axis=1, keepdims=True)
     
+@staged()
+def gmm_soft_gradient(image_path,n_components=5, sample_size=5000, steps_per_transition=30, deduplication_threshold=5, strip_rows=None, rng=42, quantize_bits=None, color_space='rgb', sampling='uniform', random_state=42):
+    """Soft GMM gradient of an image (a path or a decoded RGB array).
 
-    centroids, soft_probs = fit_gmm_to_colors(pixels, n_components)
-  
-    blended_colors_rgb = []
-    for pixel_probs in soft_probs:
-        blended_rgb = soft_blend_pixel(centroids, pixel_probs)
-        blended_colors_rgb.append(blended_rgb)
+    Pixels are subsampled with ``rng`` (a seed, ``np.random.Generator``, or None
+    for fresh entropy) and the mixture is fit with ``random_state``, so the
+    default result is reproducible. ``sampling`` is 'uniform', 'spatial' or
+    'stratified' (see ``io_utils.sample_indices``); the last two keep small
+    samples representative. ``strip_rows`` reservoir-samples the
+    full-resolution image strip by strip instead (uniform sampling only).
+    ``quantize_bits`` fits the mixture on collapsed colors (see ``fit_gmm_to_colors``).
+    ``color_space='lab'`` or ``'oklab'`` fits and blends perceptually, which usually
+    needs fewer components for an even gradient.
+    Everything stays in array form until the final gradient.
+    """
+    rng = np.random.default_rng(rng)
+    if strip_rows:
+        if sampling != 'uniform':
+            raise ValueError("Strip-by-strip sampling (strip_rows) only supports sampling='uniform'.")
+        with stage('sample', sample_size=sample_size, strip_rows=strip_rows):
+            pixels = sample_image_pixels(image_path, sample_size, strip_rows, rng=rng)
+    else:
+        pixels = load_pixels(image_path, size=(100, 100))
+        with stage('sample', sample_size=sample_size, method=sampling):
+            pixels = sample_pixels(pixels, sample_size, rng, sampling)
 
-    blended_colors_hex = [rgb_normalized_to_hex(rgb / 255) for rgb in blended_colors_rgb]
-    
+    with stage('gmm_fit', n_pixels=len(pixels), n_components=n_components):
+        centroids, soft_probs = fit_gmm_to_colors(pixels, n_components, quantize_bits=quantize_bits, color_space=color_space, random_state=random_state)
+    with stage('blend', n_pixels=len(pixels)):
+        blended = features_to_rgb(soft_blend_pixels(centroids, soft_probs), color_space)
+        blended = np.clip(np.round(blended), 0, 255).astype(np.uint8)
 
-    deduped_colors = deduplicate_colors(blended_colors_hex, threshold=deduplication_threshold)
-    
+    with stage('lab', n_colors=len(blended)):
+        labs = rgb_to_lab_array(blended)
+    with stage('dedup', n_colors=len(labs)):
+        keep = deduplicate_lab(labs, threshold=deduplication_threshold)
+    with stage('sort', n_colors=len(keep)):
+        order = sort_lab_by_closeness(labs[keep])
 
-    sorted_colors = sort_palette_by_closeness(deduped_colors)
-    
-    full_gradient = generate_full_hsl_gradient(sorted_colors, steps_per_transition=steps_per_transition)
+    with stage('gradient', n_colors=len(order), steps_per_transition=steps_per_transition):
+        full_gradient = generate_full_hsl_gradient(blended[keep][order], steps_per_transition=steps_per_transition)
     return full_gradient
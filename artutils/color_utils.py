@@ -1,5 +1,262 @@
-import colorsys, numpy as np
-from skimage import color as skcolor
+import functools, itertools, numpy as np
+from artutils.metrics import delta_e_cie76, delta_e_radius, get_metric
+
+ONE_THIRD = 1.0 / 3.0
+ONE_SIXTH = 1.0 / 6.0
+TWO_THIRD = 2.0 / 3.0
+
+# batched (N, 3) conversions
+
+def _as_float_rgb(rgb):
+    """Return RGB as floats in [0, 1]; integer arrays are taken as 0-255."""
+    rgb = np.asarray(rgb)
+    if np.issubdtype(rgb.dtype, np.integer):
+        return rgb / 255.0
+    return rgb.astype(float, copy=False)
+
+def hex_to_rgb_array(hex_colors, normalized=False):
+    """Parse a sequence of '#rrggbb' strings into an (N, 3) uint8 array (or floats in [0, 1])."""
+    digits = ''.join(h.lstrip('#') for h in hex_colors)
+    if len(digits) != 6 * len(hex_colors):
+        raise ValueError("Expected 6-digit '#rrggbb' hex colors.")
+    rgb = np.frombuffer(bytes.fromhex(digits), dtype=np.uint8).reshape(-1, 3)
+    if normalized:
+        return rgb / 255.0
+    return rgb.copy()
+
+def rgb_array_to_hex(rgb):
+    """Format an (N, 3) RGB array as '#rrggbb' strings; uint8 input is 0-255, floats are normalized."""
+    rgb = np.asarray(rgb)
+    if np.issubdtype(rgb.dtype, np.integer):
+        rgb = np.clip(rgb, 0, 255)
+    else:
+        rgb = np.clip(np.round(rgb * 255), 0, 255)
+    digits = rgb.astype(np.uint8).reshape(-1, 3).tobytes().hex()
+    return ['#' + digits[i:i + 6] for i in range(0, len(digits), 6)]
+
+def palette_to_rgb(colors):
+    """(N, 3) uint8 RGB of a palette: a ``Palette``, hex strings, or an RGB array (uint8, or floats in [0, 1])."""
+    from artutils.palette import Palette
+    if isinstance(colors, Palette):
+        return colors.rgb
+    if len(colors) and isinstance(colors[0], str):
+        return hex_to_rgb_array(colors)
+    rgb = np.asarray(colors)
+    if not np.issubdtype(rgb.dtype, np.integer):
+        rgb = np.round(rgb * 255)
+    return np.clip(rgb, 0, 255).astype(np.uint8).reshape(-1, 3)
+
+def palette_to_lab(colors):
+    """(N, 3) LAB of a palette, reusing a ``Palette``'s cached conversion."""
+    from artutils.palette import Palette
+    if isinstance(colors, Palette):
+        return colors.lab
+    return rgb_to_lab_array(palette_to_rgb(colors))
+
+def take_colors(colors, index):
+    """``colors`` subset or reordered by ``index``: a ``Palette`` for a ``Palette``, else a list."""
+    from artutils.palette import Palette
+    if isinstance(colors, Palette):
+        return colors[np.asarray(index, dtype=np.intp)]
+    return [colors[i] for i in index]
+
+def pack_rgb(pixels, bits=8):
+    """Pack (N, 3) uint8 RGB into integer bin codes keeping the top ``bits`` of each channel."""
+    pixels = np.asarray(pixels, dtype=np.uint8).reshape(-1, 3)
+    q = (pixels >> (8 - bits)).astype(np.uint32)
+    return (q[:, 0] << (2 * bits)) | (q[:, 1] << bits) | q[:, 2]
+
+def unpack_rgb(codes, bits=8):
+    """Inverse of ``pack_rgb``: the lowest RGB value of each bin as an (N, 3) uint8 array."""
+    codes = np.asarray(codes, dtype=np.uint32)
+    mask = (1 << bits) - 1
+    q = np.stack([codes >> (2 * bits), (codes >> bits) & mask, codes & mask], axis=1)
+    return (q << (8 - bits)).astype(np.uint8)
+
+# sRGB -> XYZ -> LAB with the same constants as skimage.color (sRGB primaries, D65 2°)
+_XYZ_FROM_RGB = np.array([[0.412453, 0.357580, 0.180423],
+                          [0.212671, 0.715160, 0.072169],
+                          [0.019334, 0.119193, 0.950227]])
+_RGB_FROM_XYZ = np.linalg.inv(_XYZ_FROM_RGB)
+_D65 = np.array([0.95047, 1.0, 1.08883])
+_LAB_EPSILON = 0.008856
+_LAB_KAPPA = 7.787
+
+def _srgb_decode(rgb):
+    return np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+
+@functools.lru_cache(maxsize=None)
+def _linear_lut(dtype):
+    """sRGB decoding of every 8-bit code value, so uint8 input linearizes by table lookup."""
+    table = _srgb_decode(np.arange(256) / 255.0).astype(dtype)
+    table.flags.writeable = False
+    return table
+
+def _lab_f(t):
+    return np.where(t > _LAB_EPSILON, np.cbrt(t), _LAB_KAPPA * t + 16 / 116)
+
+def _lab_f_inv(t):
+    return np.where(t > 0.2068966, t ** 3, (t - 16 / 116) / _LAB_KAPPA)
+
+def rgb_to_lab_array(rgb, dtype=float, lut_bits=None):
+    """Convert (N, 3) RGB to CIE LAB (D65).
+
+    Matches ``skimage.color.rgb2lab``. uint8 input is linearized through a
+    256-entry table; ``dtype=np.float32`` halves memory traffic on large inputs.
+    With ``lut_bits`` (1-8), uint8 input is instead looked up in a precomputed
+    RGB->LAB table, see ``rgb_to_lab_lut``.
+    """
+    rgb = np.asarray(rgb)
+    if lut_bits is not None and rgb.dtype == np.uint8:
+        return np.take(rgb_to_lab_lut(lut_bits, dtype), pack_rgb(rgb, lut_bits), axis=0)
+    linear = srgb_to_linear(rgb, dtype).reshape(-1, 3)
+    xyz = linear @ (_XYZ_FROM_RGB / _D65[:, None]).T.astype(dtype, copy=False)
+    f = _lab_f(xyz)
+    fx, fy, fz = f[:, 0], f[:, 1], f[:, 2]
+    return np.stack([116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)], axis=1)
+
+@functools.lru_cache(maxsize=4)
+def rgb_to_lab_lut(bits=6, dtype=np.float32):
+    """RGB->LAB table with one row per ``pack_rgb(rgb, bits)`` code, built once and cached.
+
+    ``bits=8`` is exact for every uint8 color (16.7M rows, 201 MB as float32);
+    fewer bits map each color to the center of its bin (6 bits: 262k rows, 3 MB).
+    """
+    codes = np.arange(1 << (3 * bits), dtype=np.uint32)
+    centers = unpack_rgb(codes, bits)
+    if bits < 8:
+        centers = centers + np.uint8(1 << (7 - bits))
+    table = rgb_to_lab_array(centers, dtype)
+    table.flags.writeable = False
+    return table
+
+def lab_to_rgb_array(lab, dtype=float):
+    """Convert (N, 3) CIE LAB to normalized RGB, clipped to the sRGB gamut (as ``skimage.color.lab2rgb``)."""
+    lab = np.asarray(lab, dtype=dtype).reshape(-1, 3)
+    fy = (lab[:, 0] + 16) / 116
+    fx = fy + lab[:, 1] / 500
+    fz = np.maximum(fy - lab[:, 2] / 200, 0)
+    xyz = _lab_f_inv(np.stack([fx, fy, fz], axis=1)) * _D65.astype(dtype)
+    return linear_to_srgb(xyz @ _RGB_FROM_XYZ.T.astype(dtype))
+
+def hex_to_lab_array(hex_colors):
+    return rgb_to_lab_array(hex_to_rgb_array(hex_colors))
+
+def _hue(rgb, maxc, rangec):
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    rc = (maxc - r) / rangec
+    gc = (maxc - g) / rangec
+    bc = (maxc - b) / rangec
+    h = np.where(r == maxc, bc - gc, np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    return (h / 6.0) % 1.0
+
+def rgb_to_hls_array(rgb):
+    """Vectorized colorsys.rgb_to_hls; returns (N, 3) columns h, l, s."""
+    rgb = _as_float_rgb(rgb).reshape(-1, 3)
+    maxc = rgb.max(axis=1)
+    minc = rgb.min(axis=1)
+    sumc = maxc + minc
+    rangec = maxc - minc
+    l = sumc / 2.0
+    gray = rangec == 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.where(l <= 0.5, rangec / sumc, rangec / (2.0 - maxc - minc))
+        h = _hue(rgb, maxc, rangec)
+    h[gray] = 0.0
+    s[gray] = 0.0
+    return np.stack([h, l, s], axis=1)
+
+def _hls_channel(m1, m2, hue):
+    hue = hue % 1.0
+    return np.select(
+        [hue < ONE_SIXTH, hue < 0.5, hue < TWO_THIRD],
+        [m1 + (m2 - m1) * hue * 6.0, m2, m1 + (m2 - m1) * (TWO_THIRD - hue) * 6.0],
+        m1,
+    )
+
+def hls_to_rgb_array(hls):
+    """Vectorized colorsys.hls_to_rgb; returns normalized (N, 3) RGB."""
+    hls = np.asarray(hls, dtype=float).reshape(-1, 3)
+    h, l, s = hls[:, 0], hls[:, 1], hls[:, 2]
+    m2 = np.where(l <= 0.5, l * (1.0 + s), l + s - (l * s))
+    m1 = 2.0 * l - m2
+    rgb = np.stack([_hls_channel(m1, m2, h + ONE_THIRD),
+                    _hls_channel(m1, m2, h),
+                    _hls_channel(m1, m2, h - ONE_THIRD)], axis=1)
+    gray = s == 0.0
+    rgb[gray] = l[gray, None]
+    return rgb
+
+def rgb_to_hsv_array(rgb):
+    """Vectorized colorsys.rgb_to_hsv; returns (N, 3) columns h, s, v."""
+    rgb = _as_float_rgb(rgb).reshape(-1, 3)
+    maxc = rgb.max(axis=1)
+    rangec = maxc - rgb.min(axis=1)
+    gray = rangec == 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = rangec / maxc
+        h = _hue(rgb, maxc, rangec)
+    h[gray] = 0.0
+    s[gray] = 0.0
+    return np.stack([h, s, maxc], axis=1)
+
+def hsv_to_rgb_array(hsv):
+    """Vectorized colorsys.hsv_to_rgb; returns normalized (N, 3) RGB."""
+    hsv = np.asarray(hsv, dtype=float).reshape(-1, 3)
+    h, s, v = hsv[:, 0], hsv[:, 1], hsv[:, 2]
+    i = (h * 6.0).astype(int)
+    f = (h * 6.0) - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    i = i % 6
+    conds = [i == 0, i == 1, i == 2, i == 3, i == 4]
+    r = np.select(conds, [v, q, p, p, t], v)
+    g = np.select(conds, [t, v, v, q, p], p)
+    b = np.select(conds, [p, p, t, v, v], q)
+    return np.stack([r, g, b], axis=1)
+
+def srgb_to_linear(rgb, dtype=float):
+    """Decode sRGB to linear light; uint8 input goes through a 256-entry lookup table."""
+    rgb = np.asarray(rgb)
+    if rgb.dtype == np.uint8:
+        return _linear_lut(dtype)[rgb]
+    return _srgb_decode(_as_float_rgb(rgb).astype(dtype, copy=False))
+
+def linear_to_srgb(linear):
+    linear = np.clip(linear, 0, 1)
+    return np.where(linear <= 0.0031308, linear * 12.92, 1.055 * linear ** (1 / 2.4) - 0.055)
+
+_LMS_FROM_LINEAR = np.array([[0.4122214708, 0.5363325363, 0.0514459929],
+                             [0.2119034982, 0.6806995451, 0.1073969566],
+                             [0.0883024619, 0.2817188376, 0.6299787005]])
+_OKLAB_FROM_LMS = np.array([[0.2104542553, 0.7936177850, -0.0040720468],
+                            [1.9779984951, -2.4285922050, 0.4505937099],
+                            [0.0259040371, 0.7827717662, -0.8086757660]])
+_LMS_FROM_OKLAB = np.linalg.inv(_OKLAB_FROM_LMS)
+_LINEAR_FROM_LMS = np.linalg.inv(_LMS_FROM_LINEAR)
+
+def rgb_to_oklab_array(rgb, dtype=float):
+    """Convert (N, 3) RGB to OKLab."""
+    lms = srgb_to_linear(rgb, dtype).reshape(-1, 3) @ _LMS_FROM_LINEAR.T.astype(dtype)
+    return np.cbrt(lms) @ _OKLAB_FROM_LMS.T.astype(dtype)
+
+def oklab_to_rgb_array(oklab, dtype=float):
+    """Convert (N, 3) OKLab to normalized RGB, clipped to the sRGB gamut."""
+    lms = (np.asarray(oklab, dtype=dtype).reshape(-1, 3) @ _LMS_FROM_OKLAB.T.astype(dtype)) ** 3
+    return linear_to_srgb(lms @ _LINEAR_FROM_LMS.T.astype(dtype))
+
+def lab_to_lch_array(lab):
+    """LAB (or OKLab) to cylindrical L, C, h with h in degrees."""
+    lab = np.asarray(lab, dtype=float).reshape(-1, 3)
+    return np.stack([lab[:, 0], np.hypot(lab[:, 1], lab[:, 2]), np.degrees(np.arctan2(lab[:, 2], lab[:, 1])) % 360], axis=1)
+
+def lch_to_lab_array(lch):
+    lch = np.asarray(lch, dtype=float).reshape(-1, 3)
+    h = np.radians(lch[:, 2])
+    return np.stack([lch[:, 0], lch[:, 1] * np.cos(h), lch[:, 1] * np.sin(h)], axis=1)
+
+# scalar helpers
 
 def hex_to_rgb_normalized(hex_color):
     hex_color = hex_color.lstrip('#')
@@ -14,39 +271,154 @@ def rgb_normalized_to_hex(rgb_normalized):
     b = int(round(rgb_normalized[2] * 255))
     return '#{:02x}{:02x}{:02x}'.format(r, g, b)
 
+_XYZ_ROWS = (_XYZ_FROM_RGB / _D65[:, None]).tolist()
+_LINEAR_VALUES = _srgb_decode(np.arange(256) / 255.0).tolist()
+
+def _lab_f_scalar(t):
+    return t ** (1 / 3) if t > _LAB_EPSILON else _LAB_KAPPA * t + 16 / 116
+
 def hex_to_lab(h):
-    rgb = np.array(hex_to_rgb_normalized(h)).reshape(1, 1, 3)
-    lab = skcolor.rgb2lab(rgb)
-    return lab[0, 0]
+    """LAB of a single hex color; plain-float math, so per-color calls skip the array setup."""
+    h = h.lstrip('#')
+    linear = _LINEAR_VALUES
+    r, g, b = linear[int(h[0:2], 16)], linear[int(h[2:4], 16)], linear[int(h[4:6], 16)]
+    fx, fy, fz = (_lab_f_scalar(m0 * r + m1 * g + m2 * b) for m0, m1, m2 in _XYZ_ROWS)
+    return np.array([116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)])
 
-def deduplicate_colors(colors, threshold=5):
-    labs = [hex_to_lab(c) for c in colors]
-    deduped_colors = colors.copy()
-    
-    i = 0
-    while i < len(labs):
-        j = i + 1
-        while j < len(labs):
-            if delta_e(labs[i], labs[j]) < threshold:
-                # Remove the second color if too similar
-                deduped_colors.pop(j)
-                labs.pop(j)
-            else:
-                j += 1
-        i += 1
-    
-    return deduped_colors
+def _greedy_keep(n, pairs):
+    """Resolve keep-first over (i < j) neighbour pairs into a boolean keep mask."""
+    keep = np.ones(n, dtype=bool)
+    if len(pairs):
+        pairs = pairs[np.argsort(pairs[:, 0], kind='stable')]
+        sources, starts = np.unique(pairs[:, 0], return_index=True)
+        ends = np.append(starts[1:], len(pairs))
+        for i, lo, hi in zip(sources.tolist(), starts.tolist(), ends.tolist()):
+            if keep[i]:
+                keep[pairs[lo:hi, 1]] = False
+    return keep
+
+def _deduplicate_scan(labs, threshold, func, chunk_size=256):
+    """Keep-first dedup for metrics without a spatial index: blockwise against the kept colors."""
+    kept = np.empty((0, 3))
+    kept_idx = []
+    for start in range(0, len(labs), chunk_size):
+        chunk = labs[start:start + chunk_size]
+        idx = np.arange(start, start + len(chunk))
+        if len(kept):
+            alive = func(kept[:, None, :], chunk[None, :, :]).min(axis=0) >= threshold
+            chunk, idx = chunk[alive], idx[alive]
+        new = np.empty_like(chunk)
+        n_new = 0
+        for lab, i in zip(chunk, idx):
+            if not n_new or func(new[:n_new], lab).min() >= threshold:
+                new[n_new] = lab
+                n_new += 1
+                kept_idx.append(i)
+        kept = np.concatenate([kept, new[:n_new]])
+    return np.array(kept_idx, dtype=int)
+
+def _ball_pairs(tree, points, radius):
+    """(tree row, point row) pairs with the tree row within ``radius[point row]`` of the point."""
+    hits = tree.query_ball_point(points, radius, return_sorted=False)
+    counts = np.fromiter(map(len, hits), dtype=np.intp, count=len(hits))
+    near = np.fromiter(itertools.chain.from_iterable(hits), dtype=np.intp, count=counts.sum())
+    return near, np.repeat(np.arange(len(points)), counts)
+
+def _deduplicate_radius(labs, threshold, func, radius, chunk_size=256):
+    """Keep-first dedup for other metrics: KD-tree candidates within ``radius`` (CIE76), confirmed with ``func``."""
+    from scipy.spatial import cKDTree
+    kept = []
+    levels = []  # (tree, points) as in deduplicate_lab
+    for start in range(0, len(labs), chunk_size):
+        idx = np.arange(start, min(start + chunk_size, len(labs)))
+        # most duplicates sit next to the color that removes them: try the nearest few before the full radius
+        for tree, points in levels:
+            if not len(idx):
+                break
+            _, near = tree.query(labs[idx], k=min(4, len(points)))
+            near = near.reshape(len(idx), -1)
+            close = func(points[near], labs[idx, None, :]) < threshold
+            idx = idx[~close.any(axis=1)]
+        for tree, points in levels:
+            if not len(idx):
+                break
+            near, rows = _ball_pairs(tree, labs[idx], radius[idx])
+            close = func(points[near], labs[idx[rows]]) < threshold
+            idx = np.delete(idx, rows[close])
+        if not len(idx):
+            continue
+
+        chunk = labs[idx]
+        near, rows = _ball_pairs(cKDTree(chunk), chunk, radius[idx])
+        earlier = near < rows
+        near, rows = near[earlier], rows[earlier]
+        close = func(chunk[near], chunk[rows]) < threshold
+        keep = _greedy_keep(len(chunk), np.column_stack([near[close], rows[close]]))
+        kept.append(idx[keep])
+
+        points = chunk[keep]
+        while levels and len(levels[-1][1]) <= len(points):
+            points = np.concatenate([levels.pop()[1], points])
+        levels.append((cKDTree(points), points))
+    return np.concatenate(kept) if kept else np.arange(0)
+
+def deduplicate_lab(labs, threshold=5, chunk_size=2048, metric='cie76'):
+    """Greedy Delta E dedup of an (N, 3) LAB array; returns the indices of the kept rows.
+
+    A color is kept when no earlier kept color lies within ``threshold``. Rows are
+    processed in chunks: each chunk is first checked against KD-trees of the colors
+    kept so far, then resolved internally from its own neighbour pairs. CIE94 and
+    CIEDE2000 search the trees within ``delta_e_radius`` and confirm the candidates
+    with their kernel; custom metrics compare each chunk against every kept color.
+    """
+    labs = np.asarray(labs, dtype=float).reshape(-1, 3)
+    n = len(labs)
+    if n < 2 or threshold <= 0:
+        return np.arange(n)
+    func = get_metric(metric)
+    if func is not delta_e_cie76:
+        radius = delta_e_radius(labs, threshold, func)
+        if radius is None:
+            return _deduplicate_scan(labs, threshold, func)
+        return _deduplicate_radius(labs, threshold, func, radius)
+
+    from scipy.spatial import cKDTree
+    kept = []
+    levels = []  # (tree, points), merged like a binary counter so queries stay logarithmic
+    for start in range(0, n, chunk_size):
+        chunk = labs[start:start + chunk_size]
+        idx = np.arange(start, start + len(chunk))
+        for tree, _ in levels:
+            d, _ = tree.query(chunk, distance_upper_bound=threshold)
+            alive = d >= threshold
+            chunk, idx = chunk[alive], idx[alive]
+        if not len(chunk):
+            continue
+
+        pairs = cKDTree(chunk).query_pairs(threshold, output_type='ndarray')
+        if len(pairs):
+            d = np.linalg.norm(chunk[pairs[:, 0]] - chunk[pairs[:, 1]], axis=1)
+            pairs = pairs[d < threshold]
+        keep = _greedy_keep(len(chunk), pairs)
+        kept.append(idx[keep])
+
+        points = chunk[keep]
+        while levels and len(levels[-1][1]) <= len(points):
+            points = np.concatenate([levels.pop()[1], points])
+        levels.append((cKDTree(points), points))
+
+    return np.concatenate(kept) if kept else np.arange(0)
+
+def deduplicate_colors(colors, threshold=5, metric='cie76'):
+    keep = deduplicate_lab(palette_to_lab(colors), threshold, metric=metric)
+    return take_colors(colors, keep)
     
-def delta_e(l1,l2):
-    return np.linalg.norm(l1 - l2)
+def delta_e(l1, l2, metric='cie76'):
+    return get_metric(metric)(l1, l2)
 
 def interpolate_hsl_gradient(color1_hex, color2_hex, steps=10):
     
-    rgb1 = hex_to_rgb_normalized(color1_hex)
-    rgb2 = hex_to_rgb_normalized(color2_hex)
-    
-    h1, l1, s1 = colorsys.rgb_to_hls(*rgb1)
-    h2, l2, s2 = colorsys.rgb_to_hls(*rgb2)
+    (h1, l1, s1), (h2, l2, s2) = rgb_to_hls_array(hex_to_rgb_array([color1_hex, color2_hex]))
     
     if abs(h2 - h1) > 0.5:
         if h1 > h2:
@@ -58,59 +430,83 @@ def interpolate_hsl_gradient(color1_hex, color2_hex, steps=10):
     l_step = (l2 - l1) / (steps - 1)
     s_step = (s2 - s1) / (steps - 1)
     
-    gradient = []
-    
-    for i in range(steps):
-        h = (h1 + i * h_step) % 1.0
-        l = l1 + i * l_step
-        s = s1 + i * s_step
-        
-        rgb = colorsys.hls_to_rgb(h, l, s)
-        hex_color = rgb_normalized_to_hex(rgb)
-        gradient.append(hex_color)
-    
-    return gradient
+    i = np.arange(steps)
+    hls = np.stack([(h1 + i * h_step) % 1.0, l1 + i * l_step, s1 + i * s_step], axis=1)
+    return rgb_array_to_hex(hls_to_rgb_array(hls))
 
-def generate_full_hsl_gradient(palette, steps_per_transition=50, duplicate_threshold=5):
-    """Expand palette by interpolating smooth HSL gradients between adjacent colors."""
-    
-    full_gradient = []
-    n = len(palette)
-    
-    for i in range(n):
-        color_start = palette[i]
-        color_end = palette[(i + 1) % n]  # wrap around for full circle
-        gradient = interpolate_hsl_gradient(color_start, color_end, steps=steps_per_transition)
-        full_gradient.extend(gradient[:-1])  # skip last color to avoid duplication
+def _wrap_hue_pairs(h1, h2, period):
+    """Shift hue endpoints so interpolation takes the short way round, as interpolate_hsl_gradient does."""
+    h1, h2 = h1.copy(), h2.copy()
+    wrap = np.abs(h2 - h1) > period / 2
+    first_larger = h1 > h2
+    h2[wrap & first_larger] += period
+    h1[wrap & ~first_larger] += period
+    return h1, h2
+
+_GRADIENT_SPACES = {
+    'hsl': (rgb_to_hls_array, hls_to_rgb_array, 0, 1.0),
+    'lab': (rgb_to_lab_array, lab_to_rgb_array, None, None),
+    'oklab': (rgb_to_oklab_array, oklab_to_rgb_array, None, None),
+    'lch': (lambda rgb: lab_to_lch_array(rgb_to_lab_array(rgb)), lambda lch: lab_to_rgb_array(lch_to_lab_array(lch)), 2, 360.0),
+}
+
+def gradient_array(palette_rgb, steps_per_transition=50, space='hsl', closed=True):
+    """Interpolate every transition of a palette at once; returns normalized (M, 3) RGB.
+
+    Each transition contributes ``steps_per_transition - 1`` colors (its end color is
+    the next transition's start). ``space`` is one of 'hsl', 'lab', 'oklab' or 'lch';
+    hues take the short way round. ``closed`` adds the last-to-first transition.
+    """
+    try:
+        to_space, from_space, hue, period = _GRADIENT_SPACES[space]
+    except KeyError:
+        raise ValueError(f"Unknown gradient space {space!r}; expected one of {sorted(_GRADIENT_SPACES)}.") from None
+    coords = to_space(palette_rgb)
+    start = coords if closed else coords[:-1]
+    end = np.roll(coords, -1, axis=0) if closed else coords[1:]
+    if hue is not None:
+        start, end = start.copy(), end.copy()
+        start[:, hue], end[:, hue] = _wrap_hue_pairs(start[:, hue], end[:, hue], period)
+
+    i = np.arange(steps_per_transition - 1)[None, :, None]
+    step = (end - start)[:, None, :] / (steps_per_transition - 1)
+    points = start[:, None, :] + i * step
+    if hue is not None:
+        points[..., hue] %= period
+    return from_space(points.reshape(-1, 3))
+
+def generate_full_hsl_gradient(palette, steps_per_transition=50, duplicate_threshold=5, space='hsl', as_array=False, metric='cie76'):
+    """Expand palette by interpolating smooth HSL gradients between adjacent colors.
 
-    full_gradient = deduplicate_colors(full_gradient, duplicate_threshold)
-    return full_gradient
+    ``palette`` is a ``Palette``, a list of hex colors or an (N, 3) RGB array; ``space`` picks the
+    interpolation space (see ``gradient_array``). Returns hex strings, or an (M, 3)
+    uint8 array with ``as_array``.
+    """
+    rgb = palette_to_rgb(palette) if len(palette) and isinstance(palette[0], str) else np.asarray(palette).reshape(-1, 3)
+    if not len(rgb):
+        return rgb.astype(np.uint8) if as_array else []
+    full_gradient = gradient_array(rgb, steps_per_transition, space=space)
+    full_gradient = np.clip(np.round(full_gradient * 255), 0, 255).astype(np.uint8)
+    full_gradient = full_gradient[deduplicate_lab(rgb_to_lab_array(full_gradient), duplicate_threshold, metric=metric)]
+    return full_gradient if as_array else rgb_array_to_hex(full_gradient)
 
     
 def generate_opposite_palette(hex_palette):
-    opposite_palette = []
-    for hex_color in hex_palette:
-        r, g, b = hex_to_rgb_normalized(hex_color)
-        h, l, s = colorsys.rgb_to_hls(r, g, b)
-        h_opp = (h + 0.5) % 1.0
-        r_opp, g_opp, b_opp = colorsys.hls_to_rgb(h_opp, l, s)
-        hex_opp = rgb_normalized_to_hex((r_opp, g_opp, b_opp))
-        opposite_palette.append(hex_opp)
-    return opposite_palette
+    from artutils.palette import Palette
+    if isinstance(hex_palette, Palette):
+        hls = np.array(hex_palette.hls)
+    else:
+        hls = rgb_to_hls_array(palette_to_rgb(hex_palette))
+    hls[:, 0] = (hls[:, 0] + 0.5) % 1.0
+    if isinstance(hex_palette, Palette):
+        return Palette(hls_to_rgb_array(hls))
+    return rgb_array_to_hex(hls_to_rgb_array(hls))
 
 def get_hex_codes_from_centers(centers):
     """Convert cluster centers to hex codes."""
-    hex_codes = []
-    for rgb in np.round(centers).astype(int):
-        hex_code = '#{:02x}{:02x}{:02x}'.format(*rgb)
-        hex_codes.append(hex_code)
-    return hex_codes
+    return rgb_array_to_hex(np.round(centers).astype(int))
 
 
 def get_hex_codes_from_gmm_means(gmm_means):
     """Convert GMM means to hex codes."""
-    hex_codes = []
-    for rgb in np.round(gmm_means).astype(int):
-        hex_code = '#{:02x}{:02x}{:02x}'.format(*rgb)
-        hex_codes.append(hex_code)
-    return hex_codes
\ No newline at end of file
+    return rgb_array_to_hex(np.round(gmm_means).astype(int))
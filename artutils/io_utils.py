@@ -1,24 +1,261 @@
-import cv2, os
-import matplotlib.pyplot as plt
-from PIL import Image
-
-def load_and_resize_image(image_path, size=(100, 100)):
-    """Load an image, convert BGR to RGB, and resize."""
-    image_bgr = cv2.imread(image_path)
-    if image_bgr is None:
-        raise ValueError(f"Image at path {image_path} could not be loaded.")
-    image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
+import io, os
+import numpy as np
+from artutils.profiling import stage
+
+# cv2, Pillow and matplotlib are imported inside the functions that use them so
+# that importing artutils stays cheap; pyplot is only ever loaded for plotting.
+
+_REDUCED_FLAGS = {2: 'IMREAD_REDUCED_COLOR_2', 4: 'IMREAD_REDUCED_COLOR_4', 8: 'IMREAD_REDUCED_COLOR_8'}
+
+def _read_source(source):
+    """Split an image source into (path, encoded buffer); file objects are read without a temp file."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return None, np.frombuffer(source, dtype=np.uint8)
+    if hasattr(source, 'read'):
+        return None, np.frombuffer(source.read(), dtype=np.uint8)
+    return os.fspath(source), None
+
+def _probe(path, buffer):
+    """(format, width, height, has_alpha) from the header only, or None if Pillow cannot parse it."""
+    from PIL import Image
+    try:
+        with Image.open(path if path is not None else io.BytesIO(buffer)) as im:
+            has_alpha = im.mode in ('RGBA', 'LA', 'PA', 'RGBa', 'La') or 'transparency' in im.info
+            return im.format, im.width, im.height, has_alpha
+    except Exception:
+        return None
+
+def _reduction(width, height, size):
+    """Largest JPEG DCT scale (1/2, 1/4, 1/8) that still leaves at least ``size`` pixels."""
+    factor = 1
+    for f in (2, 4, 8):
+        if width // f >= size[0] and height // f >= size[1]:
+            factor = f
+    return factor
+
+def _resize(image, size):
+    """``cv2.resize``; four-channel images are resized with premultiplied alpha so
+    transparent pixels do not bleed their color into the edges."""
+    import cv2
+    if image.ndim != 3 or image.shape[2] != 4:
+        return cv2.resize(image, size)
+    alpha = image[..., 3:].astype(np.float32)
+    premultiplied = np.concatenate([image[..., :3] * (alpha / 255.0), alpha], axis=-1)
+    out = cv2.resize(premultiplied, size)
+    alpha = out[..., 3:]
+    color = out[..., :3] * (255.0 / np.maximum(alpha, 1e-3))
+    color[np.broadcast_to(alpha <= 0, color.shape)] = 0
+    return np.clip(np.round(np.concatenate([color, alpha], axis=-1)), 0, 255).astype(np.uint8)
+
+def decode_image(source, size=None, reduced=True, keep_alpha=False):
+    """Decode a path, bytes/buffer or file object to RGB (RGBA with ``keep_alpha`` when present).
+
+    With a target ``size``, JPEGs are decoded at a reduced DCT scale close to it
+    before the final resize (``reduced=False`` forces a full decode). The BGR to RGB
+    swap runs after the resize, on the small image, and in place.
+    """
+    import cv2
+    path, buffer = _read_source(source)
+    info = _probe(path, buffer)
+    flags = cv2.IMREAD_COLOR
+    if keep_alpha and info and info[3]:
+        flags = cv2.IMREAD_UNCHANGED
+    elif reduced and size and info and info[0] == 'JPEG':
+        factor = _reduction(info[1], info[2], size)
+        if factor in _REDUCED_FLAGS:
+            flags = getattr(cv2, _REDUCED_FLAGS[factor])
+
+    with stage('decode', reduced=flags != cv2.IMREAD_COLOR and flags != cv2.IMREAD_UNCHANGED):
+        image = cv2.imread(path, flags) if path is not None else cv2.imdecode(buffer, flags)
+    if image is None:
+        label = path if path is not None else f"<{len(buffer)} byte buffer>"
+        raise ValueError(f"Image at path {label} could not be loaded.")
+    if image.dtype == np.uint16:
+        image = (image >> 8).astype(np.uint8)
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
     if size:
-        image_rgb = cv2.resize(image_rgb, size)
-    return image_rgb
+        with stage('resize', source=image.shape[:2], size=size):
+            image = _resize(image, size)
+    code = cv2.COLOR_BGRA2RGBA if image.shape[2] == 4 else cv2.COLOR_BGR2RGB
+    return cv2.cvtColor(image, code, dst=image)
+
+def load_and_resize_image(image_path, size=(100, 100), reduced=True):
+    """Load an image, convert BGR to RGB, and resize. Arrays are taken as already-decoded RGB.
+
+    ``image_path`` may also be encoded bytes or a file object; see ``decode_image``.
+    """
+    if isinstance(image_path, np.ndarray):
+        import cv2
+        image_rgb = image_path[..., :3] if image_path.ndim == 3 else image_path
+        if size:
+            image_rgb = cv2.resize(image_rgb, size)
+        return image_rgb
+    return decode_image(image_path, size=size, reduced=reduced)[..., :3]
+
+def load_pixels(source, size=(100, 100), alpha_threshold=0, reduced=True):
+    """Decoded (N, 3) RGB pixels of an image, leaving out pixels with alpha <= ``alpha_threshold``.
+
+    Accepts the same sources as ``decode_image`` plus RGB/RGBA arrays; pass
+    ``alpha_threshold=None`` to keep transparent pixels.
+    """
+    if isinstance(source, np.ndarray):
+        image = _resize(source, size) if size else source
+    else:
+        image = decode_image(source, size=size, reduced=reduced, keep_alpha=alpha_threshold is not None)
+    if image.ndim == 3 and image.shape[2] == 4:
+        pixels = image.reshape(-1, 4)
+        if alpha_threshold is not None:
+            pixels = pixels[pixels[:, 3] > alpha_threshold]
+        return np.ascontiguousarray(pixels[:, :3])
+    return image.reshape(-1, 3)
 
 def plot_image(image):
     """Plot an RGB image without axes."""
+    import matplotlib.pyplot as plt
     plt.imshow(image)
     plt.axis('off')
     plt.tight_layout()
     plt.show()
 
 def save_tile(tile, out_path):
+    from PIL import Image
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    Image.fromarray(tile).save(out_path)
\ No newline at end of file
+    Image.fromarray(tile).save(out_path)
+
+# streaming access for rasters too large to decode at once
+
+def _as_rgb_pixels(strip, alpha_threshold=0):
+    """Normalize a decoded strip (gray, RGB or RGBA; 8 or 16 bit) to (N, 3) uint8 RGB.
+
+    As in ``load_pixels``, pixels with alpha <= ``alpha_threshold`` (8-bit units)
+    are left out unless it is None.
+    """
+    strip = np.asarray(strip)
+    if strip.ndim == 2:
+        strip = strip[..., None].repeat(3, axis=-1)
+    if strip.dtype == np.uint16:
+        strip = (strip >> 8).astype(np.uint8)
+    strip = np.asarray(strip, dtype=np.uint8)
+    if strip.shape[-1] == 4:
+        pixels = strip.reshape(-1, 4)
+        if alpha_threshold is not None:
+            pixels = pixels[pixels[:, 3] > alpha_threshold]
+        return np.ascontiguousarray(pixels[:, :3])
+    return strip[..., :3].reshape(-1, 3)
+
+def open_raster(source, shape=None, dtype=np.uint8):
+    """Open an image as a lazily paged array where possible.
+
+    ``.npy`` files are memory-mapped, raw files are memory-mapped with the given
+    ``shape``/``dtype``, and TIFFs go through ``tifffile`` (a direct memory map when
+    uncompressed, otherwise decoded into a temporary file-backed map). Other formats
+    fall back to a full ``cv2`` decode.
+    """
+    if isinstance(source, np.ndarray):
+        return source
+    ext = os.path.splitext(str(source))[1].lower()
+    if ext == '.npy':
+        return np.load(source, mmap_mode='r')
+    if shape is not None:
+        return np.memmap(source, dtype=dtype, mode='r', shape=tuple(shape))
+    if ext in ('.tif', '.tiff'):
+        try:
+            import tifffile
+        except ImportError:
+            # decoding a huge TIFF in full is the out-of-memory case this path exists to avoid
+            raise ImportError("Streaming TIFFs requires tifffile (pip install tifffile).") from None
+        return tifffile.imread(source, out='memmap')
+    return decode_image(source, keep_alpha=True)
+
+def iter_image_strips(source, strip_rows=1024, shape=None, dtype=np.uint8, alpha_threshold=0):
+    """Yield successive horizontal strips of ``source`` as (N, 3) uint8 RGB pixels.
+
+    Transparent pixels are dropped as in ``load_pixels``.
+    """
+    raster = open_raster(source, shape=shape, dtype=dtype)
+    for start in range(0, raster.shape[0], strip_rows):
+        yield _as_rgb_pixels(raster[start:start + strip_rows], alpha_threshold)
+
+def reservoir_sample(chunks, sample_size, rng=42):
+    """Uniformly sample up to ``sample_size`` pixels from an iterable of pixel chunks in one pass."""
+    rng = np.random.default_rng(rng)
+    reservoir = np.empty((sample_size, 3), dtype=np.uint8)
+    seen = 0
+    for chunk in chunks:
+        pixels = np.asarray(chunk, dtype=np.uint8).reshape(-1, 3)
+        fill = min(max(sample_size - seen, 0), len(pixels))
+        reservoir[seen:seen + fill] = pixels[:fill]
+        rest = pixels[fill:]
+        if len(rest):
+            # algorithm R, vectorized: item t replaces slot randint(0, t] when that slot exists
+            slots = rng.integers(0, seen + fill + np.arange(len(rest)) + 1)
+            hit = np.flatnonzero(slots < sample_size)
+            slots = slots[hit]
+            _, last = np.unique(slots[::-1], return_index=True)
+            last = len(hit) - 1 - last  # later items win, as in the sequential algorithm
+            reservoir[slots[last]] = rest[hit[last]]
+        seen += len(pixels)
+    return reservoir[:min(seen, sample_size)]
+
+def sample_image_pixels(source, sample_size=5000, strip_rows=1024, rng=42):
+    """Reservoir-sample pixels from an image strip by strip, for clustering large rasters."""
+    return reservoir_sample(iter_image_strips(source, strip_rows), sample_size, rng)
+
+SAMPLING_METHODS = ('uniform', 'spatial', 'stratified')
+
+def sample_indices(n, sample_size, rng=42, method='uniform', pixels=None, bits=3):
+    """Sorted indices of ``sample_size`` distinct rows out of ``n`` (all of them when ``n <= sample_size``).
+
+    'uniform' draws a simple random sample. 'spatial' splits the rows, in raster
+    order, into ``sample_size`` equal runs and takes one at random from each,
+    so the sample covers the image evenly. 'stratified' bins ``pixels`` to
+    ``bits`` per channel and gives each bin its proportional share of the
+    sample, so the color mix matches the image even for small samples.
+    'uniform' and 'spatial' use O(sample_size) memory.
+    """
+    if method not in SAMPLING_METHODS:
+        raise ValueError(f"Unknown sampling method {method!r}; expected one of {SAMPLING_METHODS}.")
+    if n <= sample_size:
+        return np.arange(n)
+    rng = np.random.default_rng(rng)
+    if method == 'uniform':
+        return np.sort(rng.choice(n, size=sample_size, replace=False))
+    if method == 'spatial':
+        # integer run edges, so runs never overlap and every index is distinct
+        edges = np.arange(sample_size + 1) * n // sample_size
+        return edges[:-1] + rng.integers(0, np.diff(edges))
+
+    from artutils.color_utils import pack_rgb
+    if pixels is None:
+        raise ValueError("Stratified sampling needs the pixels.")
+    codes = pack_rgb(pixels, bits)
+    counts = np.bincount(codes, minlength=1 << (3 * bits))
+    # largest-remainder allocation of the sample across color bins
+    share = counts * (sample_size / n)
+    quota = np.floor(share).astype(np.intp)
+    short = sample_size - quota.sum()
+    if short:
+        quota[np.argpartition(quota - share, short - 1)[:short]] += 1
+    # a random order within each bin, then the first quota[bin] rows of every bin
+    order = np.lexsort((rng.random(n), codes))
+    starts = np.cumsum(counts) - counts
+    rank = np.arange(n) - np.repeat(starts, counts)
+    return np.sort(order[rank < np.repeat(quota, counts)])
+
+def sample_pixels(pixels, sample_size, rng=42, method='uniform'):
+    """Rows of (N, 3) ``pixels`` picked by ``sample_indices``; returned as is when there are few enough."""
+    pixels = np.asarray(pixels).reshape(-1, 3)
+    if len(pixels) <= sample_size:
+        return pixels
+    return pixels[sample_indices(len(pixels), sample_size, rng, method, pixels)]
+
+def iter_pixel_chunks(sources, chunk_size=10000, size=(100, 100), rng=42):
+    """Yield shuffled (N, 3) pixel chunks from a sequence of images (paths or arrays), one image at a time."""
+    rng = np.random.default_rng(rng)
+    for source in sources:
+        pixels = load_pixels(source, size=size)
+        pixels = pixels[rng.permutation(len(pixels))]
+        for start in range(0, len(pixels), chunk_size):
+            yield pixels[start:start + chunk_size]
@@ -0,0 +1,138 @@
+import numpy as np
+
+# Delta E kernels. Each takes two LAB arrays that broadcast over their leading
+# axes (last axis L, a, b) and returns the distances, so one function serves
+# one-to-one, one-to-many and pairwise use.
+
+def delta_e_cie76(lab1, lab2):
+    """Euclidean distance in LAB."""
+    diff = np.asarray(lab1, dtype=float) - np.asarray(lab2, dtype=float)
+    return np.sqrt(np.einsum('...i,...i->...', diff, diff))
+
+def delta_e_cie94(lab1, lab2, kL=1, kC=1, kH=1, k1=0.045, k2=0.015):
+    """CIE94 (graphic arts weights); ``lab1`` is the reference color."""
+    lab1 = np.asarray(lab1, dtype=float)
+    lab2 = np.asarray(lab2, dtype=float)
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+    C1 = np.hypot(a1, b1)
+    C2 = np.hypot(a2, b2)
+    dL = L1 - L2
+    dC = C1 - C2
+    dH2 = np.maximum((a1 - a2) ** 2 + (b1 - b2) ** 2 - dC ** 2, 0)
+    SC = 1 + k1 * C1
+    SH = 1 + k2 * C1
+    return np.sqrt((dL / kL) ** 2 + (dC / (kC * SC)) ** 2 + dH2 / (kH * SH) ** 2)
+
+def delta_e_ciede2000(lab1, lab2, kL=1, kC=1, kH=1):
+    """CIEDE2000 following Sharma, Wu and Dalal (2005)."""
+    lab1 = np.asarray(lab1, dtype=float)
+    lab2 = np.asarray(lab2, dtype=float)
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+    c_bar7 = ((np.hypot(a1, b1) + np.hypot(a2, b2)) / 2) ** 7
+    G = 0.5 * (1 - np.sqrt(c_bar7 / (c_bar7 + 25.0 ** 7)))
+    a1p = (1 + G) * a1
+    a2p = (1 + G) * a2
+    C1p = np.hypot(a1p, b1)
+    C2p = np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+
+    chroma = C1p * C2p
+    dhp = h2p - h1p
+    dhp = np.where(dhp > 180, dhp - 360, np.where(dhp < -180, dhp + 360, dhp))
+    dhp = np.where(chroma == 0, 0, dhp)
+    dLp = L2 - L1
+    dCp = C2p - C1p
+    dHp = 2 * np.sqrt(chroma) * np.sin(np.radians(dhp) / 2)
+
+    L_bar = (L1 + L2) / 2
+    C_bar = (C1p + C2p) / 2
+    h_sum = h1p + h2p
+    h_bar = np.where(np.abs(h1p - h2p) <= 180, h_sum / 2,
+                     np.where(h_sum < 360, (h_sum + 360) / 2, (h_sum - 360) / 2))
+    h_bar = np.where(chroma == 0, h_sum, h_bar)
+
+    T = (1 - 0.17 * np.cos(np.radians(h_bar - 30)) + 0.24 * np.cos(np.radians(2 * h_bar))
+         + 0.32 * np.cos(np.radians(3 * h_bar + 6)) - 0.20 * np.cos(np.radians(4 * h_bar - 63)))
+    d_theta = 30 * np.exp(-(((h_bar - 275) / 25) ** 2))
+    C_bar7 = C_bar ** 7
+    RC = 2 * np.sqrt(C_bar7 / (C_bar7 + 25.0 ** 7))
+    SL = 1 + 0.015 * (L_bar - 50) ** 2 / np.sqrt(20 + (L_bar - 50) ** 2)
+    SC = 1 + 0.045 * C_bar
+    SH = 1 + 0.015 * C_bar * T
+    RT = -np.sin(np.radians(2 * d_theta)) * RC
+
+    tL = dLp / (kL * SL)
+    tC = dCp / (kC * SC)
+    tH = dHp / (kH * SH)
+    return np.sqrt(np.maximum(tL ** 2 + tC ** 2 + tH ** 2 + RT * tC * tH, 0))
+
+DELTA_E_METRICS = {
+    'cie76': delta_e_cie76,
+    'cie94': delta_e_cie94,
+    'ciede2000': delta_e_ciede2000,
+}
+
+# CIE76 radii that enclose every color within a threshold under the other metrics,
+# so neighbour searches can run on a KD-tree in plain LAB before the exact kernel
+
+def _cie94_radius(labs, threshold):
+    # dE76 <= SC * dE94 with SC = 1 + 0.045 * C of the reference, whose chroma is at most C + dE76
+    if 0.045 * threshold >= 1:
+        return None
+    return threshold * (1 + 0.045 * np.hypot(labs[:, 1], labs[:, 2])) / (1 - 0.045 * threshold)
+
+def _ciede2000_radius(labs, threshold):
+    # a' only stretches a, and |RT| <= 2 sin(60) sqrt(Cp^7 / (Cp^7 + 25^7)), so dE76 <= dE00 * max(SL, SC / sqrt(1 - |RT| / 2));
+    # the chroma term stays under 2.6 + 0.125 * C_bar, and C_bar is at most C + dE76 / 2
+    if 0.0625 * threshold >= 1:
+        return None
+    dL = np.abs(labs[:, 0] - 50).max()
+    SL = 1 + 0.015 * dL ** 2 / np.sqrt(20 + dL ** 2)
+    chroma = (2.6 + 0.125 * np.hypot(labs[:, 1], labs[:, 2])) / (1 - 0.0625 * threshold)
+    return threshold * np.maximum(SL, chroma)
+
+_RADIUS_BOUNDS = {
+    delta_e_cie76: lambda labs, threshold: np.full(len(labs), float(threshold)),
+    delta_e_cie94: _cie94_radius,
+    delta_e_ciede2000: _ciede2000_radius,
+}
+
+def delta_e_radius(labs, threshold, metric='cie76'):
+    """Per-row CIE76 radius holding every color closer than ``threshold`` to that row under ``metric``.
+
+    Holds with the row as either argument of the kernel. Returns None for
+    custom metrics and for thresholds too large for the bound.
+    """
+    bound = _RADIUS_BOUNDS.get(get_metric(metric))
+    return None if bound is None else bound(np.asarray(labs, dtype=float).reshape(-1, 3), threshold)
+
+def register_metric(name, func):
+    """Register a broadcasting ``func(lab1, lab2)`` kernel under ``name``."""
+    DELTA_E_METRICS[name] = func
+
+def get_metric(metric='cie76'):
+    """Resolve a metric name (or pass a kernel through)."""
+    if callable(metric):
+        return metric
+    try:
+        return DELTA_E_METRICS[metric]
+    except KeyError:
+        raise ValueError(f"Unknown Delta E metric {metric!r}; expected one of {sorted(DELTA_E_METRICS)}.") from None
+
+def delta_e_to_many(lab, labs, metric='cie76'):
+    """Distances from one LAB color (the reference) to each row of an (N, 3) array."""
+    return get_metric(metric)(np.asarray(lab, dtype=float).reshape(1, 3), np.asarray(labs, dtype=float).reshape(-1, 3))
+
+def pairwise_delta_e(labs1, labs2=None, metric='cie76', chunk_size=1024):
+    """(N, M) distance matrix, evaluated in row chunks to bound temporaries."""
+    func = get_metric(metric)
+    labs1 = np.asarray(labs1, dtype=float).reshape(-1, 3)
+    labs2 = labs1 if labs2 is None else np.asarray(labs2, dtype=float).reshape(-1, 3)
+    out = np.empty((len(labs1), len(labs2)))
+    for start in range(0, len(labs1), chunk_size):
+        out[start:start + chunk_size] = func(labs1[start:start + chunk_size, None, :], labs2[None, :, :])
+    return out
@@ -0,0 +1,115 @@
+import numpy as np
+from artutils.color_utils import hex_to_rgb_array, rgb_array_to_hex, rgb_to_lab_array, rgb_to_hls_array
+
+# A palette as one contiguous (N, 3) uint8 array rather than a list of '#rrggbb'
+# strings: 3 bytes per color, parsed once, with its LAB/HLS conversions cached.
+
+def _read_only(array):
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+class Palette:
+    """Ordered colors stored as a read-only (N, 3) uint8 RGB array, with optional per-color ``weights``.
+
+    Build one from hex strings, an RGB array (uint8, or floats in [0, 1]) or
+    another ``Palette``. ``lab`` and ``hls`` are computed on first use and
+    cached. Indexing with an int gives a hex string and iterating yields hex
+    strings, so a ``Palette`` drops in wherever a hex list was used; slices,
+    index arrays and masks give new palettes (slices share memory and caches).
+    The palette functions in this package accept a ``Palette`` directly and
+    return one when they return a subset or reordering of it.
+    """
+
+    __slots__ = ('rgb', 'weights', '_lab', '_hls')
+
+    def __init__(self, colors=(), weights=None):
+        if isinstance(colors, Palette):
+            rgb, lab, hls = colors.rgb, colors._lab, colors._hls
+            weights = colors.weights if weights is None else weights
+        else:
+            lab = hls = None
+            if len(colors) and isinstance(colors[0], str):
+                rgb = hex_to_rgb_array(colors)
+            else:
+                rgb = np.asarray(colors)
+                if not np.issubdtype(rgb.dtype, np.integer):
+                    rgb = np.round(rgb * 255)
+                rgb = np.clip(rgb, 0, 255).astype(np.uint8).reshape(-1, 3)
+        if weights is not None:
+            weights = np.asarray(weights)
+            if weights.shape != (len(rgb),):
+                raise ValueError(f"Expected {len(rgb)} weights, got shape {weights.shape}.")
+            weights = _read_only(weights)
+        self.rgb = _read_only(np.ascontiguousarray(rgb))
+        self.weights = weights
+        self._lab = lab
+        self._hls = hls
+
+    @classmethod
+    def from_hex(cls, hex_colors, weights=None):
+        return cls(hex_to_rgb_array(hex_colors), weights)
+
+    @property
+    def lab(self):
+        """(N, 3) float LAB, cached."""
+        if self._lab is None:
+            self._lab = _read_only(rgb_to_lab_array(self.rgb))
+        return self._lab
+
+    @property
+    def hls(self):
+        """(N, 3) HLS in [0, 1], cached."""
+        if self._hls is None:
+            self._hls = _read_only(rgb_to_hls_array(self.rgb))
+        return self._hls
+
+    @property
+    def hex(self):
+        return rgb_array_to_hex(self.rgb)
+
+    def tolist(self):
+        """The colors as a list of '#rrggbb' strings."""
+        return self.hex
+
+    def _subset(self, key):
+        palette = Palette.__new__(Palette)
+        palette.rgb = self.rgb[key]
+        palette.weights = None if self.weights is None else self.weights[key]
+        palette._lab = None if self._lab is None else self._lab[key]
+        palette._hls = None if self._hls is None else self._hls[key]
+        return palette
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return rgb_array_to_hex(self.rgb[key])[0]
+        if isinstance(key, list):
+            key = np.asarray(key) if key else np.arange(0)
+        return self._subset(key)
+
+    def __len__(self):
+        return len(self.rgb)
+
+    def __iter__(self):
+        return iter(self.hex)
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is not None and dtype != self.rgb.dtype:
+            return self.rgb.astype(dtype)
+        return self.rgb.copy() if copy else self.rgb
+
+    def __eq__(self, other):
+        if isinstance(other, Palette):
+            return np.array_equal(self.rgb, other.rgb)
+        if isinstance(other, (list, tuple)):
+            return self.hex == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return Palette, (np.array(self.rgb), None if self.weights is None else np.array(self.weights))
+
+    def __repr__(self):
+        shown = ', '.join(self.hex[:8]) + (', ...' if len(self) > 8 else '')
+        return f"Palette([{shown}], n={len(self)}{', weighted' if self.weights is not None else ''})"
@@ -0,0 +1,265 @@
+import json, os
+import numpy as np
+from artutils.color_utils import rgb_to_lab_array, pack_rgb, unpack_rgb, palette_to_rgb, palette_to_lab
+from artutils.metrics import get_metric
+
+# Palette similarity search. Palettes are stored back to back in one (M, 3) uint8
+# color array with CSR-style offsets, embedded as fixed-length vectors for an
+# inverted-file (IVF) nearest-neighbour search, and re-ranked with Delta E.
+
+_HIST_L = np.linspace(0, 100, 5)
+_HIST_AB = np.linspace(-75, 75, 6)
+HIST_CENTERS = np.stack(np.meshgrid(_HIST_L, _HIST_AB, _HIST_AB, indexing='ij'), axis=-1).reshape(-1, 3)
+
+def pack_palettes(palettes):
+    """Concatenate palettes (``Palette`` objects, hex lists or RGB arrays) into ``(colors, offsets)``."""
+    parts = [palette_to_rgb(p) for p in palettes]
+    counts = np.array([len(p) for p in parts], dtype=np.int64)
+    offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    colors = np.concatenate(parts) if parts else np.empty((0, 3), dtype=np.uint8)
+    return colors, offsets
+
+def lab_histogram_embedding(colors, offsets, sigma=15.0, bits=5):
+    """Soft LAB histograms over ``HIST_CENTERS``, square-rooted (Hellinger) so L2 distance compares them.
+
+    Each color spreads a unit of mass over nearby bins with a Gaussian of width
+    ``sigma``; every palette gets equal total mass. Colors are quantized to
+    ``bits`` per channel first, so the Gaussians are evaluated once per distinct
+    color (at most ``2 ** (3 * bits)``) however large the batch. Rows have unit norm.
+    """
+    from scipy.sparse import csr_matrix
+    unique, inverse = np.unique(pack_rgb(colors, bits), return_inverse=True)
+    labs = rgb_to_lab_array(unpack_rgb(unique, bits) + ((1 << (8 - bits)) >> 1))
+    d2 = ((labs[:, None, :] - HIST_CENTERS[None, :, :]) ** 2).sum(axis=2)
+    w = np.exp(-(d2 - d2.min(axis=1, keepdims=True)) / (2 * sigma ** 2))
+    mass = (w / w.sum(axis=1, keepdims=True)).astype(np.float32)
+    # the CSR offsets already describe a (palette x color) membership matrix
+    counts = np.diff(offsets)
+    weights = np.repeat(1.0 / np.maximum(counts, 1), counts).astype(np.float32)
+    members = csr_matrix((weights, inverse.ravel(), offsets), shape=(len(counts), len(unique)))
+    return np.sqrt(members @ mass, dtype=np.float32)
+
+def centroid_embedding(colors, offsets, n_colors=8):
+    """The first ``n_colors`` colors of each palette in LAB, sorted by lightness and cycled to fill.
+
+    Palettes from the extractors list their dominant colors first. Returns
+    (N, 3 * n_colors) float32, scaled to roughly unit range.
+    """
+    labs = rgb_to_lab_array(colors) / 100.0
+    counts = np.diff(offsets)
+    slots = np.arange(n_colors)
+    idx = offsets[:-1, None] + slots[None, :] % np.maximum(counts, 1)[:, None]
+    emb = labs[np.minimum(idx, max(len(labs) - 1, 0))] if len(labs) else np.zeros((len(counts), n_colors, 3))
+    order = np.argsort(emb[:, :, 0], axis=1, kind='stable')
+    emb = np.take_along_axis(emb, order[:, :, None], axis=1)
+    emb[counts == 0] = 0
+    return emb.reshape(len(counts), -1).astype(np.float32)
+
+EMBEDDINGS = {
+    'histogram': lab_histogram_embedding,
+    'centroids': centroid_embedding,
+}
+
+def _nearest(vectors, centers, chunk_size=65536):
+    """Index of the nearest center (L2) for each row, in chunks."""
+    out = np.empty(len(vectors), dtype=np.int32)
+    c2 = (centers ** 2).sum(axis=1)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = np.asarray(vectors[start:start + chunk_size], dtype=np.float32)
+        out[start:start + chunk_size] = np.argmin(c2[None, :] - 2 * chunk @ centers.T, axis=1)
+    return out
+
+class PaletteIndex:
+    """Similarity search over a palette library.
+
+    ``add`` embeds palettes in batches; ``train`` builds the inverted file (k-means
+    over the embeddings) and later additions are assigned to its lists. ``search``
+    probes the ``nprobe`` nearest lists, keeps ``k * rerank`` candidates by
+    embedding distance and re-ranks them by palette Delta E; ``search_color``
+    finds palettes containing a color. ``save`` writes ``.npy`` files that
+    ``load`` memory-maps.
+    """
+
+    _ARRAYS = ('embeddings', 'colors', 'offsets', 'ids', 'centroids', 'assignments')
+
+    def __init__(self, embedding='histogram'):
+        if embedding not in EMBEDDINGS:
+            raise ValueError(f"Unknown embedding {embedding!r}; expected one of {sorted(EMBEDDINGS)}.")
+        self.embedding = embedding
+        self.embeddings = None
+        self.colors = np.empty((0, 3), dtype=np.uint8)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.centroids = None
+        self.assignments = None
+        self._pending = []
+        self._lists = None
+        self._color_tree = None
+
+    def __len__(self):
+        return len(self.ids) + sum(len(batch[3]) for batch in self._pending)
+
+    def add(self, palettes, ids=None):
+        """Add a batch of palettes; ``ids`` default to their insertion positions. Returns the ids."""
+        colors, offsets = pack_palettes(palettes)
+        n = len(offsets) - 1
+        ids = np.arange(len(self), len(self) + n, dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)
+        if len(ids) != n:
+            raise ValueError(f"Got {len(ids)} ids for {n} palettes.")
+        embeddings = EMBEDDINGS[self.embedding](colors, offsets)
+        self._pending.append((embeddings, colors, offsets, ids))
+        self._lists = self._color_tree = None
+        return ids
+
+    def _consolidate(self):
+        """Fold pending batches into the main arrays in one concatenation."""
+        if not self._pending:
+            return
+        batches = self._pending
+        self._pending = []
+        embeddings = [b[0] for b in batches]
+        colors = [b[1] for b in batches]
+        offsets = [self.offsets]
+        base = self.offsets[-1]
+        for b in batches:
+            offsets.append(b[2][1:] + base)
+            base += b[2][-1]
+        if self.embeddings is not None:
+            embeddings.insert(0, self.embeddings)
+            colors.insert(0, self.colors)
+        self.embeddings = np.concatenate(embeddings)
+        self.colors = np.concatenate(colors)
+        self.offsets = np.concatenate(offsets)
+        new_ids = np.concatenate([b[3] for b in batches])
+        if self.centroids is not None:
+            new = np.concatenate([b[0] for b in batches])
+            self.assignments = np.concatenate([self.assignments, _nearest(new, self.centroids)])
+        self.ids = np.concatenate([self.ids, new_ids])
+
+    def train(self, n_lists=None, sample_size=100_000, random_state=42):
+        """Cluster the embeddings into ``n_lists`` inverted lists (default sqrt(N))."""
+        from sklearn.cluster import MiniBatchKMeans
+        self._consolidate()
+        n = len(self.ids)
+        if n == 0:
+            raise ValueError("Add palettes before training the index.")
+        n_lists = min(n_lists or max(1, int(np.sqrt(n))), n)
+        rng = np.random.default_rng(random_state)
+        sample = self.embeddings if n <= sample_size else self.embeddings[np.sort(rng.choice(n, sample_size, replace=False))]
+        km = MiniBatchKMeans(n_clusters=n_lists, random_state=random_state, n_init=1, batch_size=4096).fit(sample)
+        self.centroids = km.cluster_centers_.astype(np.float32)
+        self.assignments = _nearest(self.embeddings, self.centroids)
+        self._lists = None
+        return self
+
+    def _inverted_lists(self):
+        if self._lists is None:
+            order = np.argsort(self.assignments, kind='stable')
+            bounds = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+            self._lists = (order, bounds)
+        return self._lists
+
+    def _candidates(self, query, nprobe, wanted=0):
+        """Rows of the ``nprobe`` nearest non-empty lists, and of further lists until there are ``wanted`` rows."""
+        if self.centroids is None:
+            return np.arange(len(self.ids))
+        order, bounds = self._inverted_lists()
+        sizes = np.diff(bounds)
+        # duplicate palettes train duplicate centroids, and all but one of their lists stay empty
+        lists = np.flatnonzero(sizes)
+        lists = lists[np.argsort(((self.centroids[lists] - query) ** 2).sum(axis=1), kind='stable')]
+        n = max(nprobe, np.searchsorted(np.cumsum(sizes[lists]), wanted) + 1)
+        return np.concatenate([order[bounds[l]:bounds[l + 1]] for l in lists[:n]])
+
+    def palette_distances(self, palette, rows, metric='cie76'):
+        """Symmetric mean nearest-color Delta E between ``palette`` and the stored palettes at ``rows``."""
+        self._consolidate()
+        func = get_metric(metric)
+        query = palette_to_lab(palette)
+        rows = np.asarray(rows, dtype=np.int64)
+        starts, counts = self.offsets[rows], self.offsets[rows + 1] - self.offsets[rows]
+        out = np.full(len(rows), np.inf)
+        valid = counts > 0
+        if not len(query) or not valid.any():
+            return out
+        starts, counts = starts[valid], counts[valid]
+        seg = np.zeros(len(counts), dtype=np.int64)
+        np.cumsum(counts[:-1], out=seg[1:])
+        idx = np.repeat(starts - seg, counts) + np.arange(counts.sum())
+        d = func(query[:, None, :], rgb_to_lab_array(self.colors[idx])[None, :, :])
+        query_to_stored = np.minimum.reduceat(d, seg, axis=1).mean(axis=0)
+        stored_to_query = np.add.reduceat(d.min(axis=0), seg) / counts
+        out[valid] = (query_to_stored + stored_to_query) / 2
+        return out
+
+    def search(self, palette, k=10, nprobe=16, rerank=10, metric='cie76'):
+        """Ids and distances of the ``k`` stored palettes most similar to ``palette``.
+
+        Distances are palette Delta E (see ``palette_distances``); with ``rerank=0``
+        the embedding distances are returned instead. Raising ``nprobe`` or
+        ``rerank`` trades latency for recall; empty lists are skipped, and probing
+        goes past ``nprobe`` lists until there are ``k * rerank`` candidates. An
+        untrained index scans everything.
+        """
+        self._consolidate()
+        if not len(self.ids):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        colors, offsets = pack_palettes([palette])
+        query = EMBEDDINGS[self.embedding](colors, offsets)[0]
+        wanted = k * rerank if rerank else k
+        rows = self._candidates(query, nprobe, wanted)
+        dist = ((np.asarray(self.embeddings[rows], dtype=np.float32) - query) ** 2).sum(axis=1)
+        keep = min(len(rows), wanted)
+        top = np.argpartition(dist, keep - 1)[:keep]
+        rows, dist = rows[top], np.sqrt(dist[top])
+        if rerank:
+            dist = self.palette_distances(palette, rows, metric)
+        order = np.argsort(dist, kind='stable')[:k]
+        return self.ids[rows[order]], dist[order]
+
+    def search_color(self, color, k=10, radius=10.0, metric='cie76'):
+        """Ids and Delta E of up to ``k`` palettes holding a color within ``radius`` (CIE76) of ``color``.
+
+        Palettes are ranked by their closest color, measured with ``metric``.
+        """
+        from scipy.spatial import cKDTree
+        self._consolidate()
+        if self._color_tree is None:
+            self._color_tree = cKDTree(rgb_to_lab_array(self.colors))
+        lab = palette_to_lab([color] if isinstance(color, str) else color)
+        hits = np.asarray(self._color_tree.query_ball_point(lab[0], r=radius), dtype=np.int64)
+        if not len(hits):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        dist = get_metric(metric)(lab, rgb_to_lab_array(self.colors[hits]))
+        rows = np.searchsorted(self.offsets, hits, side='right') - 1
+        order = np.lexsort((dist, rows))
+        rows, dist = rows[order], dist[order]
+        first = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        rows, dist = rows[first], dist[first]
+        best = np.argsort(dist, kind='stable')[:k]
+        return self.ids[rows[best]], dist[best]
+
+    def save(self, directory):
+        """Write the index as ``.npy`` arrays plus ``index.json`` under ``directory``."""
+        self._consolidate()
+        os.makedirs(directory, exist_ok=True)
+        for name in self._ARRAYS:
+            value = getattr(self, name)
+            if value is not None:
+                np.save(os.path.join(directory, f'{name}.npy'), value)
+        meta = {'embedding': self.embedding, 'size': len(self.ids), 'trained': self.centroids is not None}
+        with open(os.path.join(directory, 'index.json'), 'w') as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Open a saved index; with ``mmap`` the arrays are memory-mapped read-only rather than read."""
+        with open(os.path.join(directory, 'index.json')) as f:
+            meta = json.load(f)
+        index = cls(meta['embedding'])
+        for name in cls._ARRAYS:
+            path = os.path.join(directory, f'{name}.npy')
+            if os.path.exists(path):
+                setattr(index, name, np.load(path, mmap_mode='r' if mmap else None))
+        return index
@@ -1,89 +1,283 @@
+import time
 import numpy as np
-from artutils.color_utils import hex_to_lab, delta_e
-from artutils.io_utils import load_and_resize_image
-from skimage import color as skcolor
-
-def deduplicate_colors(colors, threshold=5):
-    labs = [hex_to_lab(c) for c in colors]
-    deduped_colors = colors.copy()
-    
-    i = 0
-    while i < len(labs):
-        j = i + 1
-        while j < len(labs):
-            if delta_e(labs[i], labs[j]) < threshold:
-                # Remove the second color if too similar
-                deduped_colors.pop(j)
-                labs.pop(j)
+from artutils.color_utils import rgb_to_lab_array, rgb_array_to_hex, deduplicate_colors, deduplicate_lab, pack_rgb, unpack_rgb, palette_to_lab, take_colors
+from artutils.metrics import delta_e_cie76, get_metric
+from artutils.io_utils import load_pixels, iter_image_strips
+from artutils.profiling import stage, staged
+
+# palette ordering
+
+def _edge_lengths(pts, closed, metric):
+    nxt = np.roll(pts, -1, axis=0) if closed else pts[1:]
+    return metric(pts[:len(nxt)], nxt)
+
+def _two_opt(labs, order, closed=False, deadline=None, metric=delta_e_cie76):
+    """Segment-reversal refinement; the first color stays in place."""
+    order = order.copy()
+    n = len(order)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(n - 2):
+            if deadline is not None and time.perf_counter() > deadline:
+                return order
+            pts = labs[order]
+            edges = _edge_lengths(pts, closed, metric)
+            last = n - 2 if closed and i == 0 else n - 1
+            j = np.arange(i + 2, last + 1)
+            if not len(j):
+                continue
+            nxt = j + 1
+            gain = metric(pts[i], pts[j]) - edges[i]
+            if closed:
+                gain += metric(pts[i + 1], pts[nxt % n]) - edges[j]
             else:
-                j += 1
-        i += 1
-    
-    return deduped_colors
-
-def sort_palette_by_closeness(colors):
-    if not colors:
-        return []
-    
-    labs = [hex_to_lab(c) for c in colors]
-    used = [False] * len(colors)
-    
-    sorted_colors = []
-    current_idx = 0
-    sorted_colors.append(colors[current_idx])
-    used[current_idx] = True
-    
-    for _ in range(len(colors) - 1):
-        min_dist = float('inf')
-        next_idx = None
-        
-        for j in range(len(colors)):
-            if not used[j]:
-                dist = delta_e(labs[current_idx], labs[j])
-                if dist < min_dist:
-                    min_dist = dist
-                    next_idx = j
-        
-        sorted_colors.append(colors[next_idx])
-        used[next_idx] = True
-        current_idx = next_idx
-    
-    return sorted_colors
-
-def extract_palette_by_frequency_and_lab(image_path, resize_dim=(300, 300), min_pixel_count=150, delta_e_threshold=5, max_colors=None):
-
-    image_rgb = load_and_resize_image(image_path, size=resize_dim)
-    pixels = image_rgb.reshape(-1, 3)
-    
-
-    colors, counts = np.unique(pixels, axis=0, return_counts=True)
-
-    sorted_indices = np.argsort(-counts)
-    colors = colors[sorted_indices]
-    counts = counts[sorted_indices]
-
-    filtered_colors = [c for i, c in enumerate(colors) if counts[i] >= min_pixel_count]
-
-
-    final_colors = []
-    final_labs = []
-    
-    for rgb in filtered_colors:
-        rgb_norm = np.array(rgb) / 255.0
-        lab = skcolor.rgb2lab(rgb_norm.reshape(1, 1, 3))[0, 0]
-        
-        if not final_labs:
-            final_colors.append(rgb)
-            final_labs.append(lab)
-        else:
-            dists = np.linalg.norm(np.array(final_labs) - lab, axis=1)
-            if np.all(dists > delta_e_threshold):
-                final_colors.append(rgb)
-                final_labs.append(lab)
-        
-        if max_colors and len(final_colors) >= max_colors:
-            break
-
-    hex_codes = ['#{:02x}{:02x}{:02x}'.format(*np.round(rgb).astype(int)) for rgb in final_colors]
-    
-    return hex_codes
+                inner = nxt < n
+                gain[inner] += metric(pts[i + 1], pts[nxt[inner]]) - edges[j[inner]]
+            best = int(np.argmin(gain))
+            if gain[best] < -1e-9:
+                order[i + 1:j[best] + 1] = order[i + 1:j[best] + 1][::-1]
+                improved = True
+    return order
+
+def _or_opt(labs, order, closed=False, deadline=None, metric=delta_e_cie76, max_segment=3):
+    """Segment-move refinement: relocate runs of up to ``max_segment`` colors, possibly reversed."""
+    order = order.copy()
+    n = len(order)
+    improved = True
+    while improved:
+        improved = False
+        for length in range(1, max_segment + 1):
+            i = 1
+            while i + length <= n:
+                if deadline is not None and time.perf_counter() > deadline:
+                    return order
+                pts = labs[order]
+                edges = _edge_lengths(pts, closed, metric)
+                end = i + length - 1
+                after = end + 1 if end + 1 < n else (0 if closed else None)
+                if after is None:
+                    removal = edges[i - 1]
+                else:
+                    removal = edges[i - 1] + edges[end] - metric(pts[i - 1], pts[after])
+
+                d_first = metric(pts[i], pts)
+                d_last = metric(pts[end], pts)
+                j = np.concatenate([np.arange(0, i - 1), np.arange(end + 1, n)])
+                if not len(j):
+                    i += 1
+                    continue
+                nxt = j + 1
+                if closed:
+                    nxt %= n
+                    base = edges[j]
+                    forward = d_first[j] + d_last[nxt] - base
+                    backward = d_last[j] + d_first[nxt] - base
+                else:
+                    inner = nxt < n
+                    forward, backward = d_first[j].copy(), d_last[j].copy()
+                    forward[inner] += d_last[nxt[inner]] - edges[j[inner]]
+                    backward[inner] += d_first[nxt[inner]] - edges[j[inner]]
+                cost = np.minimum(forward, backward)
+                best = int(np.argmin(cost))
+                if cost[best] - removal < -1e-9:
+                    target = j[best]
+                    segment = order[i:end + 1]
+                    if backward[best] < forward[best]:
+                        segment = segment[::-1]
+                    rest = np.concatenate([order[:i], order[end + 1:]])
+                    pos = target + 1 if target < i else target + 1 - length
+                    order = np.concatenate([rest[:pos], segment, rest[pos:]])
+                    improved = True
+                i += 1
+    return order
+
+def _greedy_walk_scan(labs, metric=delta_e_cie76):
+    n = len(labs)
+    order = np.zeros(n, dtype=int)
+    remaining = np.arange(1, n)
+    candidates = labs[1:]
+    used = np.zeros(len(remaining), dtype=bool)
+    n_used = 0
+    current = 0
+    for k in range(1, n):
+        dist = metric(labs[current], candidates)
+        dist[used] = np.inf
+        pick = int(np.argmin(dist))
+        current = remaining[pick]
+        used[pick] = True
+        order[k] = current
+        n_used += 1
+        if 2 * n_used > len(used):  # compact so each step only scans unvisited colors
+            remaining, candidates = remaining[~used], candidates[~used]
+            used = np.zeros(len(remaining), dtype=bool)
+            n_used = 0
+    return order
+
+def _greedy_walk_tree(labs):
+    """Same walk as ``_greedy_walk_scan`` but finds the next color with k-nearest KD-tree queries."""
+    from scipy.spatial import cKDTree
+    n = len(labs)
+    order = np.zeros(n, dtype=int)
+    remaining = np.arange(1, n)
+    tree = cKDTree(labs[1:])
+    used = np.zeros(len(remaining), dtype=bool)
+    n_used = 0
+    current = 0
+    for k in range(1, n):
+        k_query = 8
+        while True:
+            k_query = min(k_query, len(remaining))
+            dist, idx = tree.query(labs[current], k=k_query)
+            dist, idx = np.atleast_1d(dist), np.atleast_1d(idx)
+            free = ~used[idx]
+            if free.any() or k_query == len(remaining):
+                break
+            k_query *= 4
+        dist, idx = dist[free], idx[free]
+        pick = idx[dist == dist[0]].min()  # ties go to the earliest color, as in the scan
+        current = remaining[pick]
+        used[pick] = True
+        order[k] = current
+        n_used += 1
+        if 2 * n_used > len(used) and k < n - 1:  # rebuild over unvisited colors only
+            remaining = remaining[~used]
+            tree = cKDTree(labs[remaining])
+            used = np.zeros(len(remaining), dtype=bool)
+            n_used = 0
+    return order
+
+ORDER_REFINERS = {'2opt': _two_opt, 'oropt': _or_opt}
+
+def sort_lab_by_closeness(labs, refine=None, time_budget=0.5, closed=False, metric='cie76'):
+    """Order an (N, 3) LAB array by a greedy nearest-neighbour walk from the first row.
+
+    ``refine`` names one or more entries of ``ORDER_REFINERS`` (or passes callables
+    taking ``(labs, order, closed, deadline, metric)``) that improve the walk until
+    ``time_budget`` seconds have elapsed. ``closed`` scores the ordering as a loop,
+    as a color wheel draws it. Returns the row order.
+    """
+    labs = np.asarray(labs, dtype=float).reshape(-1, 3)
+    n = len(labs)
+    metric = get_metric(metric)
+    if n > 1024 and metric is delta_e_cie76:
+        order = _greedy_walk_tree(labs)
+    else:
+        order = _greedy_walk_scan(labs, metric)
+
+    if refine is not None and n > 3:
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        refiners = [refine] if isinstance(refine, str) or callable(refine) else refine
+        for refiner in refiners:
+            if isinstance(refiner, str):
+                refiner = ORDER_REFINERS[refiner]
+            order = refiner(labs, order, closed=closed, deadline=deadline, metric=metric)
+    return order
+
+def sort_palette_by_closeness(colors, refine=None, time_budget=0.5, closed=False, metric='cie76'):
+    if not len(colors):
+        return take_colors(colors, [])
+    order = sort_lab_by_closeness(palette_to_lab(colors), refine, time_budget, closed, metric)
+    return take_colors(colors, order)
+
+# frequency palettes
+
+def color_histogram(pixels, bits=8):
+    """Count the colors of (N, 3) uint8 pixels without a row-wise sort.
+
+    With ``bits < 8`` colors are binned per channel and each bin reports the mean
+    color of its pixels. Returns ``(colors, counts)`` ordered by descending count,
+    ties broken by RGB order.
+    """
+    pixels = np.asarray(pixels, dtype=np.uint8).reshape(-1, 3)
+    codes = pack_rgb(pixels, bits)
+    n_bins = 1 << (3 * bits)
+    if bits == 8 and len(codes) < n_bins // 8:
+        # a 1-D integer sort beats a 16.7M-bin bincount for small images
+        bins, counts = np.unique(codes, return_counts=True)
+    else:
+        counts = np.bincount(codes, minlength=n_bins)
+        bins = np.flatnonzero(counts)
+        counts = counts[bins]
+
+    if bits == 8:
+        colors = unpack_rgb(bins, bits)
+    else:
+        sums = np.stack([np.bincount(codes, weights=pixels[:, c], minlength=n_bins)[bins] for c in range(3)], axis=1)
+        colors = np.round(sums / counts[:, None]).astype(np.uint8)
+    return _by_count(colors, counts)
+
+def _by_count(colors, counts):
+    order = np.argsort(-counts, kind='stable')
+    return colors[order], counts[order]
+
+def streaming_color_histogram(chunks, bits=8):
+    """``color_histogram`` over an iterable of pixel chunks, never holding more than one chunk.
+
+    Exact (8-bit) counts are kept sparse and merged chunk by chunk; quantized bins
+    use dense count and color-sum tables.
+    """
+    if bits == 8:
+        bins, counts = np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.int64)
+        for chunk in chunks:
+            chunk_bins, chunk_counts = np.unique(pack_rgb(chunk), return_counts=True)
+            bins, inverse = np.unique(np.concatenate([bins, chunk_bins]), return_inverse=True)
+            counts = np.bincount(inverse, weights=np.concatenate([counts, chunk_counts]), minlength=len(bins)).astype(np.int64)
+        return _by_count(unpack_rgb(bins), counts)
+
+    n_bins = 1 << (3 * bits)
+    counts = np.zeros(n_bins, dtype=np.int64)
+    sums = np.zeros((n_bins, 3))
+    for chunk in chunks:
+        pixels = np.asarray(chunk, dtype=np.uint8).reshape(-1, 3)
+        codes = pack_rgb(pixels, bits)
+        counts += np.bincount(codes, minlength=n_bins)
+        for c in range(3):
+            sums[:, c] += np.bincount(codes, weights=pixels[:, c], minlength=n_bins)
+    bins = np.flatnonzero(counts)
+    colors = np.round(sums[bins] / counts[bins, None]).astype(np.uint8)
+    return _by_count(colors, counts[bins])
+
+def palette_from_histogram(colors, counts, min_pixel_count=150, delta_e_threshold=5, max_colors=None, metric='cie76', as_palette=False):
+    """Greedy palette from count-ordered colors: keep colors further than the threshold from every kept color.
+
+    ``as_palette=True`` returns a ``Palette`` weighted by pixel counts instead of hex strings.
+    """
+    colors = np.asarray(colors, dtype=np.uint8).reshape(-1, 3)
+    counts = np.asarray(counts)
+    frequent = counts >= min_pixel_count
+    candidates = colors[frequent]
+    with stage('lab', n_colors=len(candidates)):
+        labs = rgb_to_lab_array(candidates)
+    # acceptance is strict (d > threshold); the dedup engine drops d < threshold
+    with stage('dedup', n_colors=len(labs), metric=metric):
+        keep = deduplicate_lab(labs, np.nextafter(delta_e_threshold, np.inf), metric=metric)
+    if max_colors:
+        keep = keep[:max_colors]
+    if as_palette:
+        from artutils.palette import Palette
+        return Palette(candidates[keep], weights=counts[frequent][keep])
+    return rgb_array_to_hex(candidates[keep])
+
+@staged()
+def extract_palette_by_frequency_and_lab(image_path, resize_dim=(300, 300), min_pixel_count=150, delta_e_threshold=5, max_colors=None, metric='cie76', quantize_bits=8, as_palette=False):
+    """Palette of the most frequent colors that are at least ``delta_e_threshold`` apart.
+
+    Fully transparent pixels are not counted. ``resize_dim=None`` keeps full
+    resolution; ``quantize_bits`` (e.g. 5 or 6) bins similar colors together before counting.
+    ``as_palette=True`` returns a count-weighted ``Palette`` rather than hex strings.
+    """
+    pixels = load_pixels(image_path, size=resize_dim)
+    with stage('histogram', n_pixels=len(pixels), bits=quantize_bits):
+        colors, counts = color_histogram(pixels, bits=quantize_bits)
+    return palette_from_histogram(colors, counts, min_pixel_count, delta_e_threshold, max_colors, metric, as_palette)
+
+@staged()
+def extract_palette_streaming(source, strip_rows=1024, min_pixel_count=150, delta_e_threshold=5, max_colors=None, metric='cie76', quantize_bits=8, as_palette=False):
+    """Full-resolution ``extract_palette_by_frequency_and_lab`` that reads ``source`` strip by strip.
+
+    ``source`` may be a path (TIFF and ``.npy`` rasters are memory-mapped) or an array.
+    """
+    with stage('histogram', strip_rows=strip_rows, bits=quantize_bits):
+        colors, counts = streaming_color_histogram(iter_image_strips(source, strip_rows), bits=quantize_bits)
+    return palette_from_histogram(colors, counts, min_pixel_count, delta_e_threshold, max_colors, metric, as_palette)
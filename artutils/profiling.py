@@ -0,0 +1,192 @@
+import contextlib, contextvars, functools, itertools, logging, os, threading, time, tracemalloc
+
+# Opt-in stage instrumentation. Pipelines wrap their steps in ``stage(name, **attrs)``;
+# while nothing listens, ``stage`` hands back a shared no-op context, so the cost
+# when disabled is one ContextVar lookup per stage.
+
+_listeners = []
+_listeners_lock = threading.Lock()
+_collector = contextvars.ContextVar('artutils_profile_collector', default=None)
+_active = contextvars.ContextVar('artutils_profile_active', default=None)
+_ids = itertools.count(1)
+_NULL = contextlib.nullcontext()
+
+def add_listener(callback):
+    """Call ``callback(span)`` with every finished stage span, in any thread. Returns ``callback``."""
+    with _listeners_lock:
+        _listeners.append(callback)
+    return callback
+
+def remove_listener(callback):
+    with _listeners_lock:
+        _listeners.remove(callback)
+
+def enabled():
+    return bool(_listeners) or _collector.get() is not None
+
+class _Stage:
+    """Records one span: wall and CPU time, attributes, traced memory and nesting."""
+
+    __slots__ = ('name', 'attrs', 'span', 'token', 'start', 'cpu', 'mem', 'child_peak', 'parent')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.parent = _active.get()
+        self.token = _active.set(self)
+        self.child_peak = 0
+        self.mem = None
+        if tracemalloc.is_tracing():
+            self.mem, peak = tracemalloc.get_traced_memory()
+            if self.parent is not None:
+                # the parent's peak so far would be lost to reset_peak()
+                self.parent.child_peak = max(self.parent.child_peak, peak)
+            tracemalloc.reset_peak()
+        self.span = {
+            'name': self.name,
+            'span_id': next(_ids),
+            'parent_id': self.parent.span['span_id'] if self.parent else None,
+            'thread': threading.get_ident(),
+            'start_ns': time.time_ns(),
+            'attrs': self.attrs,
+        }
+        self.cpu = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def set(self, **attrs):
+        """Attach attributes discovered inside the stage (output sizes, chosen k, ...)."""
+        self.attrs.update(attrs)
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.start
+        span = self.span
+        span['wall_s'] = wall
+        span['cpu_s'] = time.process_time() - self.cpu
+        span['end_ns'] = span['start_ns'] + int(wall * 1e9)
+        if exc_type is not None:
+            span['error'] = f"{exc_type.__name__}: {exc}"
+        if self.mem is not None and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # reset_peak() in child stages hides their peaks from ours, so they report up
+            peak = max(peak, self.child_peak)
+            span['mem_delta_bytes'] = current - self.mem
+            span['mem_peak_bytes'] = peak - self.mem
+            if self.parent is not None:
+                self.parent.child_peak = max(self.parent.child_peak, peak)
+        _active.reset(self.token)
+
+        collected = _collector.get()
+        if collected is not None:
+            collected.append(span)
+        for callback in tuple(_listeners):
+            callback(span)
+        return False
+
+def stage(name, **attrs):
+    """Context manager timing one pipeline stage; ``attrs`` record input sizes and parameters.
+
+    Yields an object with ``set(**attrs)`` for values known only at the end, or
+    ``None`` when profiling is off.
+    """
+    if not _listeners and _collector.get() is None:
+        return _NULL
+    return _Stage(name, attrs)
+
+def staged(name=None):
+    """Decorator running the whole function as one stage (named after the function by default)."""
+    def decorate(func):
+        label = name or func.__name__
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _listeners and _collector.get() is None:
+                return func(*args, **kwargs)
+            with _Stage(label, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+@contextlib.contextmanager
+def profile(memory=False):
+    """Collect the spans of every stage run in this context into the yielded list.
+
+    ``memory=True`` turns on tracemalloc for the duration (slow, but adds traced
+    memory deltas and peaks to each span). Spans appear in completion order, so
+    children come before their parent.
+    """
+    spans = []
+    token = _collector.set(spans)
+    started = memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        yield spans
+    finally:
+        if started:
+            tracemalloc.stop()
+        _collector.reset(token)
+
+# exporters
+
+def summarize(spans):
+    """Total wall/CPU seconds and call counts per stage name, slowest first."""
+    totals = {}
+    for span in spans:
+        row = totals.setdefault(span['name'], {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0})
+        row['calls'] += 1
+        row['wall_s'] += span['wall_s']
+        row['cpu_s'] += span['cpu_s']
+    return dict(sorted(totals.items(), key=lambda item: -item[1]['wall_s']))
+
+def log_listener(logger=None, level=logging.DEBUG):
+    """A listener that logs each span as ``stage <name> <wall> ms ...``; register with ``add_listener``."""
+    logger = logger or logging.getLogger('artutils.profiling')
+
+    def callback(span):
+        if logger.isEnabledFor(level):
+            attrs = ' '.join(f"{k}={v}" for k, v in span['attrs'].items())
+            logger.log(level, "stage %s %.2f ms (cpu %.2f ms) %s", span['name'], span['wall_s'] * 1e3, span['cpu_s'] * 1e3, attrs)
+    return callback
+
+def to_otel_spans(spans, trace_id=None):
+    """Convert spans to OpenTelemetry-style dicts (ids as hex, times in Unix nanoseconds)."""
+    trace_id = trace_id or os.urandom(16).hex()
+    out = []
+    for span in spans:
+        attributes = {f"artutils.{k}": v for k, v in span['attrs'].items()}
+        attributes['artutils.cpu_s'] = span['cpu_s']
+        for key in ('mem_delta_bytes', 'mem_peak_bytes'):
+            if key in span:
+                attributes[f"artutils.{key}"] = span[key]
+        out.append({
+            'name': span['name'],
+            'trace_id': trace_id,
+            'span_id': f"{span['span_id']:016x}",
+            'parent_span_id': f"{span['parent_id']:016x}" if span['parent_id'] else None,
+            'start_time_unix_nano': span['start_ns'],
+            'end_time_unix_nano': span['end_ns'],
+            'status': {'code': 'ERROR', 'message': span['error']} if 'error' in span else {'code': 'OK'},
+            'attributes': attributes,
+        })
+    return out
+
+def otel_listener(tracer=None):
+    """A listener that replays each span onto an OpenTelemetry tracer (requires opentelemetry-api).
+
+    Spans are recreated with their original start and end times; nesting shows up
+    through the timestamps rather than parent links.
+    """
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        raise ImportError("otel_listener requires opentelemetry-api (pip install opentelemetry-api).") from None
+    tracer = tracer or trace.get_tracer('artutils')
+
+    def callback(span):
+        attributes = {k: v if isinstance(v, (bool, int, float, str)) else repr(v) for k, v in span['attrs'].items()}
+        attributes['cpu_s'] = span['cpu_s']
+        otel_span = tracer.start_span(span['name'], start_time=span['start_ns'], attributes=attributes)
+        otel_span.end(end_time=span['end_ns'])
+    return callback
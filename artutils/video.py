@@ -0,0 +1,172 @@
+import os
+import numpy as np
+from artutils.color_utils import pack_rgb, rgb_array_to_hex
+from artutils.io_utils import load_pixels
+from artutils.palette_tools import palette_from_histogram
+from artutils.profiling import stage
+
+# Palettes for frame streams. A tracker keeps a decayed color histogram of recent
+# frames and only recomputes the palette when that distribution has moved, so
+# steady shots cost one histogram update per frame.
+
+def iter_video_frames(source, size=(300, 300), step=1):
+    """Yield RGB frames from a video path or camera index (via ``cv2.VideoCapture``), or from an iterable of arrays.
+
+    Frames are resized to ``size`` (None keeps them as decoded); ``step`` keeps
+    every ``step``-th frame. Arrays from an iterable are taken as RGB(A).
+    """
+    if not isinstance(source, (str, int, os.PathLike)):
+        for i, frame in enumerate(source):
+            if i % step == 0:
+                frame = np.asarray(frame)
+                if size and frame.shape[1::-1] != tuple(size):
+                    import cv2
+                    frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                yield frame
+        return
+
+    import cv2
+    capture = cv2.VideoCapture(os.fspath(source) if not isinstance(source, int) else source)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {source}")
+    try:
+        i = 0
+        while True:
+            # grab() skips decoding the frames that step leaves out
+            if not capture.grab():
+                break
+            if i % step == 0:
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                if size:
+                    frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                yield cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame)
+            i += 1
+    finally:
+        capture.release()
+
+def _total_variation(p, q):
+    """Half the L1 distance between two histograms, each normalized to sum 1 (0 = same, 1 = disjoint)."""
+    return 0.5 * np.abs(p / max(p.sum(), 1e-12) - q / max(q.sum(), 1e-12)).sum()
+
+class VideoPaletteTracker:
+    """Incremental palette of a frame stream.
+
+    Each ``update(frame)`` folds the frame's colors, binned to ``bits`` per channel,
+    into a histogram whose older frames fade by ``decay`` per frame. The palette
+    is recomputed only when the histogram has drifted more than ``threshold``
+    (total variation distance) from the one the current palette came from. A
+    single frame further than ``cut_threshold`` from the history counts as a
+    cut: the history is dropped so the new shot's palette is not mixed with the
+    old one.
+
+    ``method='frequency'`` builds the palette with ``palette_from_histogram``;
+    ``min_pixel_count`` applies to the average frame. ``method='kmeans'`` fits
+    ``n_colors`` ``MiniBatchKMeans`` centers to the count-weighted histogram
+    bins, starting from the previous centers within a shot, and orders them by
+    weight.
+    """
+
+    def __init__(self, method='frequency', bits=5, decay=0.9, threshold=0.15, cut_threshold=0.5, n_colors=8,
+                 min_pixel_count=150, delta_e_threshold=5, max_colors=None, metric='cie76', as_palette=False, random_state=42):
+        if method not in ('frequency', 'kmeans'):
+            raise ValueError(f"Unknown method {method!r}; expected 'frequency' or 'kmeans'.")
+        self.method = method
+        self.bits = bits
+        self.decay = decay
+        self.threshold = threshold
+        self.cut_threshold = cut_threshold
+        self.n_colors = n_colors
+        self.min_pixel_count = min_pixel_count
+        self.delta_e_threshold = delta_e_threshold
+        self.max_colors = max_colors
+        self.metric = metric
+        self.as_palette = as_palette
+        self.random_state = random_state
+        n_bins = 1 << (3 * bits)
+        self.counts = np.zeros(n_bins)
+        self.sums = np.zeros((n_bins, 3))
+        self.frames = 0.0
+        self.reference = None
+        self.palette = None
+        self.model = None
+        self.n_updates = self.n_recomputes = self.n_cuts = 0
+
+    def reset(self):
+        """Forget the history (the next frame starts a new shot)."""
+        self.model = None
+        self.counts[:] = 0
+        self.sums[:] = 0
+        self.frames = 0.0
+        self.reference = None
+
+    def update(self, frame):
+        """Add one RGB(A) frame; returns ``(palette, changed)``.
+
+        ``changed`` is True when the palette was recomputed for this frame.
+        """
+        pixels = load_pixels(np.asarray(frame), size=None)
+        n_bins = len(self.counts)
+        with stage('histogram', n_pixels=len(pixels), bits=self.bits):
+            codes = pack_rgb(pixels, self.bits)
+            counts = np.bincount(codes, minlength=n_bins)
+        self.n_updates += 1
+
+        cut = self.reference is not None and _total_variation(counts, self.counts) > self.cut_threshold
+        if cut:
+            self.n_cuts += 1
+            self.reset()
+        with stage('accumulate'):
+            self.counts *= self.decay
+            self.sums *= self.decay
+            self.frames = self.frames * self.decay + 1
+            self.counts += counts
+            for c in range(3):
+                self.sums[:, c] += np.bincount(codes, weights=pixels[:, c], minlength=n_bins)
+
+        if self.reference is not None and _total_variation(self.counts, self.reference) <= self.threshold:
+            return self.palette, False
+        with stage('palette', method=self.method, cut=cut):
+            self.palette = self._compute()
+        self.reference = self.counts.copy()
+        self.n_recomputes += 1
+        return self.palette, True
+
+    def _compute(self):
+        bins = np.flatnonzero(self.counts)
+        counts = self.counts[bins] / self.frames
+        colors = np.round(self.sums[bins] / self.counts[bins, None]).astype(np.uint8)
+        if self.method == 'frequency':
+            order = np.argsort(-counts, kind='stable')
+            return palette_from_histogram(colors[order], counts[order], self.min_pixel_count, self.delta_e_threshold,
+                                          self.max_colors, self.metric, self.as_palette)
+
+        from sklearn.cluster import MiniBatchKMeans
+        n_colors = min(self.n_colors, len(bins))
+        init = 'k-means++'
+        if self.model is not None and self.model.n_clusters == n_colors:
+            init = self.model.cluster_centers_
+        X = colors.astype(float)
+        self.model = MiniBatchKMeans(n_clusters=n_colors, init=init, n_init=1, batch_size=4096, random_state=self.random_state)
+        self.model.fit(X, sample_weight=counts)
+        weight = np.bincount(self.model.labels_, weights=counts, minlength=n_colors)
+        order = np.argsort(-weight, kind='stable')
+        centers = np.clip(np.round(self.model.cluster_centers_[order]), 0, 255).astype(np.uint8)
+        if self.as_palette:
+            from artutils.palette import Palette
+            return Palette(centers, weights=weight[order])
+        return rgb_array_to_hex(centers)
+
+def video_palettes(source, size=(300, 300), step=1, **tracker_kwargs):
+    """Yield ``(frame_index, palette, changed)`` for every kept frame of ``source``.
+
+    ``source`` is anything ``iter_video_frames`` reads; ``tracker_kwargs`` go to
+    ``VideoPaletteTracker``. Frame indices count the frames of the source, so
+    they stay aligned with it when ``step`` skips frames. Unchanged palettes are
+    the same object as on the previous frame.
+    """
+    tracker = VideoPaletteTracker(**tracker_kwargs)
+    for i, frame in enumerate(iter_video_frames(source, size=size, step=step)):
+        palette, changed = tracker.update(frame)
+        yield i * step, palette, changed
@@ -1,9 +1,14 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
+import functools, io
 import numpy as np
-from artutils.palette_tools import sort_palette_by_closeness
+from artutils.color_utils import palette_to_rgb, palette_to_lab
+from artutils.palette_tools import sort_lab_by_closeness
 
-def plot_swatch(pal, save_path=None):
+# matplotlib is imported inside each plot so importing artutils never loads pyplot
+
+def plot_swatch(pal, save_path=None, show=True):
+    """Matplotlib swatch row for interactive use; shown (blocking) when ``show``, then closed."""
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as patches
     fig, ax = plt.subplots(figsize=(len(pal), 2))
     for i, c in enumerate(pal):
         ax.add_patch(patches.Rectangle((i, 0), 1, 1, color=c))
@@ -13,22 +18,101 @@ def plot_swatch(pal, save_path=None):
     plt.tight_layout()
     if save_path:
         plt.savefig(save_path, dpi=300, bbox_inches='tight')
-    plt.show()
+    if show:
+        plt.show()
+    plt.close(fig)
 
-def plot_wheel(pal, inner=0.5, width=0.5, figsize=(8, 8), save_path=None):
-    pal = sort_palette_by_closeness(pal)
-    n = len(pal)
+def plot_wheel(pal, inner=0.5, width=0.5, figsize=(8, 8), save_path=None, refine=None, show=True):
+    """Matplotlib color wheel for interactive use; shown (blocking) when ``show``, then closed."""
+    import matplotlib.pyplot as plt
+    rgb = palette_to_rgb(pal)
+    if len(rgb):
+        rgb = rgb[sort_lab_by_closeness(palette_to_lab(pal), refine=refine, closed=True)]
+    n = len(rgb)
     angles = np.linspace(0, 2 * np.pi, n, endpoint=False)
 
     fig, ax = plt.subplots(figsize=figsize, subplot_kw=dict(polar=True))
     ax.set_theta_offset(np.pi / 2)
     ax.set_theta_direction(-1)
-
-    for angle, c in zip(angles, pal):
-        ax.bar(angle, width, 2 * np.pi / n, bottom=inner, color=c, linewidth=0)
+    if n:
+        ax.bar(angles, width, 2 * np.pi / n, bottom=inner, color=rgb / 255.0, linewidth=0)
 
     ax.axis('off')
     plt.tight_layout()
     if save_path:
         plt.savefig(save_path, dpi=300, bbox_inches='tight')
-    plt.show()
+    if show:
+        plt.show()
+    plt.close(fig)
+
+# headless rendering: rasterize straight into arrays, no figures
+
+def _encode(image, fmt, save_path):
+    """Return ``image`` as an array or PNG bytes, saving it to ``save_path`` when given."""
+    if fmt not in ('array', 'png'):
+        raise ValueError(f"Unknown render format {fmt!r}; expected 'array' or 'png'.")
+    if fmt == 'array' and not save_path:
+        return image
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format='PNG')
+    data = buffer.getvalue()
+    if save_path:
+        with open(save_path, 'wb') as f:
+            f.write(data)
+    return data if fmt == 'png' else image
+
+def render_swatch(pal, cell_size=(100, 200), fmt='array', save_path=None):
+    """Swatch row as an (H, N * W, 3) uint8 image, one ``cell_size`` (W, H) block per color.
+
+    ``fmt='png'`` returns encoded PNG bytes instead of the array. An empty
+    palette gives a 1-pixel-wide white image, since PNG cannot be empty.
+    """
+    rgb = palette_to_rgb(pal)
+    w, h = cell_size
+    row = np.repeat(rgb, w, axis=0) if len(rgb) else np.full((1, 3), 255, dtype=np.uint8)
+    return _encode(np.ascontiguousarray(np.broadcast_to(row, (h,) + row.shape)), fmt, save_path)
+
+@functools.lru_cache(maxsize=8)
+def _polar_grid(size, supersample):
+    """Clockwise-from-top angle (as a fraction of a turn) and radius (1 at the edge) per subpixel."""
+    n = size * supersample
+    c = (np.arange(n) + 0.5) / n * 2 - 1
+    x, y = np.meshgrid(c, c)
+    turn = (np.arctan2(x, -y) / (2 * np.pi)) % 1.0
+    radius = np.hypot(x, y)
+    turn.flags.writeable = radius.flags.writeable = False
+    return turn, radius
+
+def render_wheel(pal, size=512, inner=0.5, width=0.5, refine=None, background=(255, 255, 255), supersample=2, fmt='array', save_path=None, sort=True):
+    """Color wheel as a (size, size, 3) uint8 image, laid out like ``plot_wheel``.
+
+    Each pixel looks up its palette entry from a cached polar-coordinate grid, so
+    cost depends on the image size rather than the number of colors. ``supersample``
+    antialiases edges; ``background=None`` returns RGBA with a transparent
+    background. ``sort=False`` keeps the palette order. ``fmt='png'`` returns PNG bytes.
+    """
+    rgb = palette_to_rgb(pal)
+    if sort and len(rgb) > 1:
+        rgb = rgb[sort_lab_by_closeness(palette_to_lab(pal), refine=refine, closed=True)]
+    n = len(rgb)
+    turn, radius = _polar_grid(size, supersample)
+
+    # lookup table: one row per palette color, plus the background as row n
+    if background is None:
+        table = np.zeros((n + 1, 4), dtype=np.uint8)
+        table[:n, :3] = rgb
+        table[:n, 3] = 255
+    else:
+        table = np.vstack([rgb, np.asarray(background, dtype=np.uint8).reshape(1, 3)])
+    # each bar is centred on its angle, as with matplotlib's default bar alignment
+    index = (turn * n + 0.5).astype(np.intp) % max(n, 1)
+    index[(radius < inner / (inner + width)) | (radius > 1.0)] = n
+    image = np.take(table, index, axis=0)
+    if supersample > 1:
+        total = np.zeros((size, size, table.shape[1]), dtype=np.uint32)
+        for i in range(supersample):
+            for j in range(supersample):
+                total += image[i::supersample, j::supersample]
+        image = ((total + supersample ** 2 // 2) // supersample ** 2).astype(np.uint8)
+    return _encode(image, fmt, save_path)
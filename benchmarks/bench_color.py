@@ -0,0 +1,140 @@
+"""Accuracy and speed of the in-package sRGB->LAB/OKLab conversions against scikit-image.
+
+Checks ``rgb_to_lab_array`` and ``lab_to_rgb_array`` against a frozen table of
+``skimage.color.rgb2lab`` values, so drift is caught without scikit-image
+installed. With scikit-image available it also compares the float64, float32
+and lookup-table paths on random colors and times single-color and batched
+conversion against it. Exits non-zero if the exact paths drift beyond
+tolerance. Run from the repository root:
+
+    python benchmarks/bench_color.py
+"""
+import os, sys, time, warnings
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # the repo root, so no install is needed
+try:
+    from skimage import color as skcolor
+except ImportError:  # not a dependency of artutils; the frozen table still runs
+    skcolor = None
+from artutils.color_utils import hex_to_lab, rgb_to_lab_array, lab_to_rgb_array, rgb_to_lab_lut, rgb_to_oklab_array
+
+TOLERANCE = {'float64': 1e-9, 'float32': 1e-3}
+
+# skimage.color.rgb2lab (D65, 2 degree observer) of 8-bit sRGB colors, rounded to 12 decimals
+REFERENCE = [
+    ((0, 0, 0), (0, 0, 0)),
+    ((255, 255, 255), (100, -0.002454937862, 0.004653421154)),
+    ((255, 0, 0), (53.240587943745, 80.092308225692, 67.202751044429)),
+    ((0, 255, 0), (87.735099488319, -86.183029744395, 83.179703175385)),
+    ((0, 0, 255), (32.295672565014, 79.185590911766, -107.857300206695)),
+    ((255, 255, 0), (97.139507039713, -21.554681016954, 94.478122276478)),
+    ((0, 255, 255), (91.11330144068, -48.090596233017, -14.126329820082)),
+    ((255, 0, 255), (60.323506527415, 98.233053863113, -60.821015244145)),
+    ((128, 128, 128), (53.585013452169, -0.001472645553, 0.002791451497)),
+    ((1, 1, 1), (0.274173496024, -0.000017407127, 0.000032995217)),
+    ((10, 10, 10), (2.741734960238, -0.000174071274, 0.000329952171)),
+    ((11, 11, 11), (3.022898983244, -0.000191922226, 0.000363788658)),
+    ((254, 254, 254), (99.654922232769, -0.002447634892, 0.004639578118)),
+    ((192, 57, 43), (44.67517728338, 52.910114686403, 39.240163368635)),
+    ((46, 204, 113), (72.862974890425, -59.717210589337, 34.202198792171)),
+    ((52, 152, 219), (60.156835696435, -6.099142719188, -42.225405942332)),
+    ((67, 43, 117), (24.33838428763, 29.419896839557, -38.775011497776)),
+    ((249, 164, 204), (76.711500867823, 36.887567466728, -7.366496444982)),
+    ((144, 176, 1), (67.263819720571, -30.077923944755, 68.554014453452)),
+    ((83, 33, 52), (20.73190689223, 25.59985234334, -0.929348161669)),
+]
+
+
+def _best_of(func, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def _delta(a, b):
+    d = np.sqrt(((np.asarray(a, dtype=float) - b) ** 2).sum(axis=1))
+    return d.max(), d.mean()
+
+
+def check_reference():
+    """Compare the float64/float32 paths and the LAB->RGB inverse (0-255 scale) with ``REFERENCE``; returns the failure count."""
+    rgb = np.array([c for c, _ in REFERENCE], dtype=np.uint8)
+    lab = np.array([l for _, l in REFERENCE])
+    rows = {
+        'float64': _delta(rgb_to_lab_array(rgb), lab),
+        'float32': _delta(rgb_to_lab_array(rgb, dtype=np.float32), lab),
+        'lab2rgb float64': _delta(lab_to_rgb_array(lab) * 255, rgb),
+    }
+    return _report('frozen table', rows)
+
+
+def _report(title, rows):
+    failures = 0
+    print(f"{title:<18}{'max dE':>12}{'mean dE':>12}")
+    for name, (worst, mean) in rows.items():
+        bad = name in TOLERANCE and worst > TOLERANCE[name]
+        failures += bad
+        print(f"{name:<18}{worst:>12.2e}{mean:>12.2e}{'  FAIL' if bad else ''}")
+    return failures
+
+
+def accuracy(n=500_000, seed=0):
+    rng = np.random.default_rng(seed)
+    rgb = rng.integers(0, 256, (n, 3), dtype=np.uint8)
+    reference = skcolor.rgb2lab(rgb / 255.0)
+    lab = np.column_stack([rng.uniform(0, 100, n), rng.uniform(-100, 100, n), rng.uniform(-100, 100, n)])
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # out-of-gamut clipping warnings
+        rgb_reference = skcolor.lab2rgb(lab)
+
+    rows = {
+        'float64': _delta(rgb_to_lab_array(rgb), reference),
+        'float32': _delta(rgb_to_lab_array(rgb, dtype=np.float32), reference),
+        'lab2rgb float64': _delta(lab_to_rgb_array(lab), rgb_reference),
+    }
+    for bits in (5, 6, 7, 8):
+        rows[f'lut {bits} bits'] = _delta(rgb_to_lab_array(rgb, dtype=np.float32, lut_bits=bits), reference)
+
+    return _report('vs skimage', rows)
+
+
+def speed(n=1_000_000, seed=0):
+    rng = np.random.default_rng(seed)
+    rgb = rng.integers(0, 256, (n, 3), dtype=np.uint8)
+    pixel = np.array([[[0.8, 0.4, 0.1]]])
+    for bits in (6, 8):
+        rgb_to_lab_lut(bits)  # build outside the timings
+
+    print(f"\n{'single color':<30}{'us/call':>10}")
+    print(f"{'skimage rgb2lab 1x1x3':<30}{_best_of(lambda: skcolor.rgb2lab(pixel), 200) * 1e6:>10.1f}")
+    print(f"{'hex_to_lab':<30}{_best_of(lambda: hex_to_lab('#cc6619'), 200) * 1e6:>10.1f}")
+
+    cases = {
+        'skimage rgb2lab': lambda: skcolor.rgb2lab(rgb / 255.0),
+        'rgb_to_lab_array float64': lambda: rgb_to_lab_array(rgb),
+        'rgb_to_lab_array float32': lambda: rgb_to_lab_array(rgb, dtype=np.float32),
+        'lut 6 bits': lambda: rgb_to_lab_array(rgb, dtype=np.float32, lut_bits=6),
+        'lut 8 bits': lambda: rgb_to_lab_array(rgb, dtype=np.float32, lut_bits=8),
+        'rgb_to_oklab_array float32': lambda: rgb_to_oklab_array(rgb, dtype=np.float32),
+    }
+    print(f"\n{f'{n:,} uint8 colors':<30}{'Mcolors/s':>10}")
+    for name, func in cases.items():
+        print(f"{name:<30}{n / _best_of(func, 3) / 1e6:>10.1f}")
+
+
+def main():
+    failures = check_reference()
+    print()
+    if skcolor is None:
+        print("scikit-image not installed; skipping the random-color comparison and timings")
+    else:
+        failures += accuracy()
+        speed()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
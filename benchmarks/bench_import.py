@@ -0,0 +1,60 @@
+"""Import time of the artutils modules, and which heavy dependencies each one loads.
+
+Each module is imported in a fresh interpreter. Heavy dependencies (matplotlib,
+scikit-learn, scikit-image, OpenCV, kneed, scipy, Pillow) are only imported by the
+functions that use them, so the run exits non-zero when any module loads one at
+import time or exceeds its time budget. Run from the repository root:
+
+    python benchmarks/bench_import.py
+"""
+import json, os, subprocess, sys
+
+HEAVY = ('matplotlib.pyplot', 'matplotlib', 'sklearn', 'skimage', 'cv2', 'kneed', 'scipy', 'PIL')
+
+# module -> import budget in seconds (numpy alone is most of it)
+BUDGETS = {
+    'artutils': 0.05,
+    'artutils.metrics': 0.5,
+    'artutils.color_utils': 0.5,
+    'artutils.palette_tools': 0.5,
+    'artutils.io_utils': 0.5,
+    'artutils.clustering': 0.5,
+    'artutils.cache': 0.5,
+    'artutils.batch': 0.5,
+    'artutils.visualization': 0.5,
+}
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, repeat=3):
+    """Best-of-``repeat`` cold import time of ``module`` and the heavy modules it pulled in."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', _PROBE.format(module=module, heavy=HEAVY)],
+                             env=env, capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout))
+    return min(r['seconds'] for r in runs), runs[0]['loaded']
+
+
+def main():
+    failures = 0
+    print(f"{'module':<26}{'import (ms)':>12}  loaded")
+    for module, budget in BUDGETS.items():
+        seconds, loaded = measure(module)
+        status = 'FAIL' if loaded or seconds > budget else 'ok'
+        failures += status == 'FAIL'
+        print(f"{module:<26}{seconds * 1e3:>12.1f}  {', '.join(loaded) or '-'}  {status}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
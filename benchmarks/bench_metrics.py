@@ -0,0 +1,38 @@
+"""Throughput of the Delta E kernels, one-to-many and pairwise.
+
+Run from the repository root:
+
+    python benchmarks/bench_metrics.py
+"""
+import os, sys, time
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # the repo root, so no install is needed
+from artutils.metrics import DELTA_E_METRICS, delta_e_to_many, pairwise_delta_e
+
+
+def _random_labs(n, rng):
+    return np.column_stack([rng.uniform(0, 100, n), rng.uniform(-80, 80, n), rng.uniform(-80, 80, n)])
+
+
+def _best_of(func, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(n_many=100_000, n_pairwise=1_000, seed=0):
+    rng = np.random.default_rng(seed)
+    many = _random_labs(n_many, rng)
+    grid = _random_labs(n_pairwise, rng)
+    print(f"{'metric':<12}{'one-to-many (Mpairs/s)':>24}{'pairwise (Mpairs/s)':>22}")
+    for name in DELTA_E_METRICS:
+        t_many = _best_of(lambda: delta_e_to_many(many[0], many, metric=name))
+        t_pair = _best_of(lambda: pairwise_delta_e(grid, metric=name), repeat=3)
+        print(f"{name:<12}{n_many / t_many / 1e6:>24.1f}{n_pairwise ** 2 / t_pair / 1e6:>22.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""Benchmark suite for the public artutils entry points on synthetic inputs.
+
+Sweeps palette sizes, image sizes/kinds and ``max_k`` over
+``deduplicate_colors``, ``sort_palette_by_closeness``,
+``extract_palette_by_frequency_and_lab``, ``fit_kmeans``, ``fit_gmm`` and
+``gmm_soft_gradient``, plus ``PaletteIndex.search`` over palette libraries and
+``video_palettes`` over a synthetic clip. Each case reports best and median wall time over
+``--repeat`` runs, then one extra run under tracemalloc for the peak traced
+memory and the bytes and blocks still allocated afterwards. Results are
+written as JSON tagged with the git commit, so two runs can be compared.
+Run from the repository root:
+
+    python benchmarks/bench_suite.py --output before.json
+    python benchmarks/bench_suite.py --output after.json
+    python benchmarks/bench_suite.py --compare before.json after.json
+"""
+import argparse, fnmatch, itertools, json, os, platform, statistics, subprocess, sys, time, tracemalloc, warnings
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # the repo root, so no install is needed
+from synthetic import IMAGE_KINDS, make_image, random_palette
+from artutils.color_utils import deduplicate_colors
+from artutils.palette_tools import sort_palette_by_closeness, extract_palette_by_frequency_and_lab
+from artutils.clustering import fit_kmeans, fit_gmm, gmm_soft_gradient
+from artutils.palette_index import PaletteIndex
+from artutils.video import video_palettes
+
+PALETTE_SIZES = (100, 1_000, 10_000)
+SORT_SIZES = (50, 500, 5_000)
+IMAGE_SIZES = ((256, 256), (1024, 1024))
+KMEANS_MAX_K = (4, 8, 11)
+GMM_MAX_K = (5, 10, 20)
+INDEX_SIZES = (10_000, 100_000)
+
+QUICK = {
+    'PALETTE_SIZES': (100, 1_000),
+    'SORT_SIZES': (50, 500),
+    'IMAGE_SIZES': ((256, 256),),
+    'KMEANS_MAX_K': (4, 8),
+    'GMM_MAX_K': (5, 10),
+    'INDEX_SIZES': (10_000,),
+}
+
+
+def cases(quick=False):
+    """Yield ``(name, params, setup)``; ``setup()`` builds the inputs and returns the call to time."""
+    sizes = {k: QUICK[k] if quick else globals()[k] for k in QUICK}
+
+    for n in sizes['PALETTE_SIZES']:
+        yield 'deduplicate_colors', {'n_colors': n}, lambda n=n: (
+            lambda pal=random_palette(n): deduplicate_colors(pal))
+    for n in sizes['SORT_SIZES']:
+        yield 'sort_palette_by_closeness', {'n_colors': n}, lambda n=n: (
+            lambda pal=random_palette(n): sort_palette_by_closeness(pal))
+    for kind in IMAGE_KINDS:
+        for shape in sizes['IMAGE_SIZES']:
+            params = {'image': kind, 'height': shape[0], 'width': shape[1]}
+            yield 'extract_palette_by_frequency_and_lab', params, lambda kind=kind, shape=shape: (
+                lambda img=make_image(kind, shape): extract_palette_by_frequency_and_lab(img, resize_dim=None))
+            yield 'gmm_soft_gradient', params, lambda kind=kind, shape=shape: (
+                lambda img=make_image(kind, shape): gmm_soft_gradient(img, strip_rows=256, rng=0))
+    pixels = lambda kind: make_image(kind, (100, 100)).reshape(-1, 3)
+    for kind, bits in itertools.product(('posterized', 'photo'), (None, 6)):
+        for max_k in sizes['KMEANS_MAX_K']:
+            for use_elbow in (False, True):
+                params = {'image': kind, 'max_k': max_k, 'use_elbow': use_elbow, 'quantize_bits': bits}
+                yield 'fit_kmeans', params, lambda kind=kind, max_k=max_k, use_elbow=use_elbow, bits=bits: (
+                    lambda px=pixels(kind): fit_kmeans(px, max_k=max_k, use_elbow=use_elbow, quantize_bits=bits))
+        for max_k in sizes['GMM_MAX_K']:
+            for use_bic in (False, True):
+                params = {'image': kind, 'max_k': max_k, 'use_bic': use_bic, 'quantize_bits': bits}
+                yield 'fit_gmm', params, lambda kind=kind, max_k=max_k, use_bic=use_bic, bits=bits: (
+                    lambda px=pixels(kind): fit_gmm(px, max_k=max_k, use_bic=use_bic, quantize_bits=bits))
+    for n in sizes['INDEX_SIZES']:
+        yield 'PaletteIndex.search', {'n_palettes': n}, lambda n=n: (
+            lambda index=palette_index(n), query=random_palette(8, seed=n): index.search(query))
+    for method in ('frequency', 'kmeans'):
+        yield 'video_palettes', {'method': method, 'frames': 60}, lambda method=method: (
+            lambda frames=clip(60): list(video_palettes(frames, method=method)))
+
+
+def clip(n_frames, shape=(360, 640), shot_length=20):
+    """Panning shots of photo-like and posterized images, cutting every ``shot_length`` frames."""
+    frames = []
+    for shot in range(0, n_frames, shot_length):
+        base = make_image(('photo', 'posterized')[shot // shot_length % 2], shape, seed=shot)
+        frames.extend(np.roll(base, 4 * t, axis=1) for t in range(min(shot_length, n_frames - shot)))
+    return frames
+
+
+def palette_index(n, seed=0):
+    """A trained index over ``n`` random palettes of 3-12 colors."""
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(3, 13, n)
+    colors = rng.integers(0, 256, (sizes.sum(), 3), dtype=np.uint8)
+    index = PaletteIndex()
+    index.add(np.split(colors, np.cumsum(sizes)[:-1]))
+    return index.train()
+
+
+def measure(call, repeat):
+    call()  # warm up caches and lazy imports outside the timings
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = call()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    diff = after.compare_to(before, 'filename')
+    del result
+    return {
+        'best_s': min(times),
+        'median_s': statistics.median(times),
+        'peak_bytes': peak,
+        'retained_bytes': sum(s.size_diff for s in diff),
+        'retained_blocks': sum(s.count_diff for s in diff),
+    }
+
+
+def _git_commit():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def run(repeat=3, quick=False, select=None):
+    commit, dirty = _git_commit()
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'repeat': repeat,
+        'results': [],
+    }
+    for name, params, setup in cases(quick):
+        if select and not fnmatch.fnmatch(name, select):
+            continue
+        stats = measure(setup(), repeat)
+        report['results'].append({'name': name, 'params': params, **stats})
+        label = ' '.join(f'{k}={v}' for k, v in params.items())
+        print(f"{name:<38}{label:<44}{stats['best_s'] * 1e3:>10.1f} ms{stats['peak_bytes'] / 2 ** 20:>9.1f} MiB",
+              file=sys.stderr)
+    return report
+
+
+def _key(row):
+    return row['name'], json.dumps(row['params'], sort_keys=True)
+
+
+def compare(old_path, new_path, threshold=1.10):
+    """Print new/old time and peak-memory ratios per case; returns the number of slowdowns past ``threshold``."""
+    with open(old_path) as f:
+        old = {_key(r): r for r in json.load(f)['results']}
+    with open(new_path) as f:
+        new = json.load(f)['results']
+    regressions = 0
+    print(f"{'case':<80}{'time':>8}{'peak':>8}")
+    for row in new:
+        base = old.get(_key(row))
+        if base is None:
+            continue
+        t = row['best_s'] / base['best_s']
+        m = row['peak_bytes'] / max(base['peak_bytes'], 1)
+        flag = '  SLOWER' if t > threshold else ''
+        regressions += bool(flag)
+        label = ' '.join(f'{k}={v}' for k, v in row['params'].items())
+        print(f"{row['name'] + ' ' + label:<80}{t:>7.2f}x{m:>7.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', help='write the JSON report here (default: stdout)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--quick', action='store_true', help='smaller sweep for a fast smoke run')
+    parser.add_argument('--select', help="only run entry points matching this glob, e.g. 'fit_*'")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two JSON reports')
+    args = parser.parse_args(argv)
+    warnings.filterwarnings('ignore', category=UserWarning)  # sklearn convergence notes on posterized inputs
+
+    if args.compare:
+        return 1 if compare(*args.compare) else 0
+    report = run(args.repeat, args.quick, args.select)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
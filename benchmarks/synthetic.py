@@ -0,0 +1,84 @@
+"""Deterministic synthetic images and palettes for the benchmarks.
+
+Every generator takes ``(height, width)`` and a seed and returns an
+(H, W, 3) uint8 RGB array, so runs are comparable across machines and commits.
+"""
+import numpy as np
+
+
+def gradient_image(shape, seed=0):
+    """Smooth two-axis gradient between four random corner colors."""
+    rng = np.random.default_rng(seed)
+    h, w = shape
+    corners = rng.integers(0, 256, (2, 2, 3)).astype(float)
+    y = np.linspace(0, 1, h)[:, None, None]
+    x = np.linspace(0, 1, w)[None, :, None]
+    top = corners[0, 0] * (1 - x) + corners[0, 1] * x
+    bottom = corners[1, 0] * (1 - x) + corners[1, 1] * x
+    return np.round(top * (1 - y) + bottom * y).astype(np.uint8)
+
+
+def noise_image(shape, seed=0):
+    """Uniform RGB noise: nearly every pixel a distinct color (worst case for counting)."""
+    return np.random.default_rng(seed).integers(0, 256, tuple(shape) + (3,), dtype=np.uint8)
+
+
+def posterized_image(shape, seed=0, n_colors=8, n_regions=64):
+    """Flat-color art: a Voronoi partition into regions drawn from a small palette."""
+    rng = np.random.default_rng(seed)
+    h, w = shape
+    palette = rng.integers(0, 256, (n_colors, 3), dtype=np.uint8)
+    sites = rng.random((n_regions, 2)) * (h, w)
+    labels = rng.integers(0, n_colors, n_regions)
+    yy, xx = np.mgrid[0:h, 0:w]
+    nearest = np.full((h, w), np.inf)
+    region = np.zeros((h, w), dtype=int)
+    for i, (sy, sx) in enumerate(sites):
+        d = (yy - sy) ** 2 + (xx - sx) ** 2
+        closer = d < nearest
+        nearest[closer] = d[closer]
+        region[closer] = i
+    return palette[labels[region]]
+
+
+def photo_like_image(shape, seed=0, n_blobs=12, grain=6.0):
+    """Photographic-like statistics: soft overlapping color blobs, shading and sensor grain."""
+    rng = np.random.default_rng(seed)
+    h, w = shape
+    yy, xx = np.mgrid[0:h, 0:w]
+    yy = yy / max(h - 1, 1)
+    xx = xx / max(w - 1, 1)
+    image = np.zeros((h, w, 3))
+    weight = np.full((h, w), 1e-6)
+    for _ in range(n_blobs):
+        cy, cx = rng.random(2)
+        sigma = rng.uniform(0.08, 0.35)
+        g = np.exp(-((yy - cy) ** 2 + (xx - cx) ** 2) / (2 * sigma ** 2))
+        image += g[..., None] * rng.integers(0, 256, 3)
+        weight += g
+    image /= weight[..., None]
+    image *= (0.75 + 0.25 * xx * (1 - yy))[..., None]
+    image += rng.normal(0, grain, image.shape)
+    return np.clip(np.round(image), 0, 255).astype(np.uint8)
+
+
+IMAGE_KINDS = {
+    'gradient': gradient_image,
+    'noise': noise_image,
+    'posterized': posterized_image,
+    'photo': photo_like_image,
+}
+
+
+def make_image(kind, shape, seed=0):
+    return IMAGE_KINDS[kind](shape, seed)
+
+
+def random_palette(n, seed=0):
+    """``n`` random hex colors, with near-duplicates mixed in so deduplication has work to do."""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 256, (max(n // 2, 1), 3))
+    jitter = base[rng.integers(0, len(base), n - len(base))] + rng.integers(-4, 5, (n - len(base), 3))
+    rgb = np.clip(np.concatenate([base, jitter]), 0, 255).astype(np.uint8)
+    rgb = rgb[rng.permutation(len(rgb))]
+    return ['#%02x%02x%02x' % tuple(c) for c in rgb]